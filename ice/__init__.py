@@ -0,0 +1,29 @@
+# Reusable, array-based models behind the ICE project scripts.
+#
+# The package itself needs only NumPy, so batch workers can import it without a GUI
+# backend. Figures live in ice.plotting, which is not imported here and loads
+# matplotlib only when a plotting function is called. The on-disk cache
+# (ice.result_cache) and the process-pool drivers (ice.study, ice.uncertainty) are
+# imported on their own too, as evaluating a model needs none of them.
+
+from .air_properties import (atkinson_cycle_variable, cp_air, diesel_cycle_variable,
+                             dual_cycle_variable, h_air, otto_cycle_variable, s0_air, u_air)
+from .breathing import breathing_map, valve_flow_area
+from .cam_profiles import PROFILES, ProfileTable, cam_lift, cam_peak_kinematics, profile_table, register_profile
+from .cam_timing import cam_timing_sweep, overlap_regions
+from .cycles import (atkinson_cycle, compare_cycles, diesel_cycle, dual_cycle, dual_heat_input,
+                     dual_heat_input_cached, otto_cycle)
+from .engine_geometry import cylinder_volume, displacement_volume
+from .inverse import solve_dual_cycle
+from .isentropic_flow import (isentropic_ratios, mach_from_area_ratio, mach_from_density_ratio,
+                              mach_from_pressure_ratio, mach_from_temperature_ratio, nozzle_map,
+                              valve_curtain_map)
+from .lift_stream import LiftStats, iter_lift_chunks, stream_lift_stats
+from .multi_cylinder import FIRING_ORDERS, firing_phases, multi_cylinder_lift
+from .pv_loop import (cheapest_resolution, closed_form_efficiency, loop_curves, loop_integral,
+                      resolution_study, shoelace_work)
+from .single_zone import simulate_cycle, simulate_ideal_cycle, wiebe_fraction
+from .state_store import STATE_DTYPE, StateStore, state_records
+from .thermo import isentropic_curve, isentropic_curves, isentropic_num_points, isentropic_process
+from .throat_flow import critical_pressure_ratio, throat_flow
+from .valve_lift import CYCLE_ANGLE, combined_lift, valve_events_lift, valve_lift
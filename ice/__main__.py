@@ -0,0 +1,185 @@
+# Command-line entry point: python -m ice <command> ...
+
+import argparse
+import json
+import sys
+
+from . import benchmark, instrument, uncertainty
+from .study import CHUNK_SIZE, MODELS, GridPoints, grid_axis, read_points, run_study
+
+
+def _parse_value(text):
+    # "8:20:13" -> 13 evenly spaced values, "8,10,12" -> a list, "9" -> a single value
+    if ':' in text:
+        start, stop, num = text.split(':')
+        return {'start': float(start), 'stop': float(stop), 'num': int(num)}
+    return [float(x) for x in text.split(',')]
+
+
+def _assignments(items, option):
+    parsed = {}
+    for item in items:
+        name, sep, value = item.partition('=')
+        if not sep:
+            raise SystemExit(f'{option} expects NAME=VALUE, got {item!r}')
+        parsed[name.strip()] = _parse_value(value)
+    return parsed
+
+
+def _fixed_values(items, option='--set'):
+    # NAME=VALUE assignments of single numbers; ranges and lists belong in --grid/--vary
+    fixed = {}
+    for name, value in _assignments(items, option).items():
+        if not isinstance(value, list) or len(value) != 1:
+            raise SystemExit(f'{option} {name} takes a single number, not a range or list')
+        fixed[name] = value[0]
+    return fixed
+
+
+def _study(args):
+    if bool(args.points) == bool(args.grid):
+        raise SystemExit('give either --points FILE or at least one --grid NAME=VALUES')
+
+    fixed = _fixed_values(args.set)
+    if args.points:
+        points, file_fixed = read_points(args.points)
+        fixed = {**file_fixed, **fixed}
+    else:
+        points = GridPoints({name: grid_axis(spec) for name, spec in _assignments(args.grid, '--grid').items()})
+
+    computed = run_study(args.model, points, args.out, fixed=fixed, chunk_size=args.chunk_size,
+                         max_workers=args.workers, checkpoint=args.checkpoint)
+    print(f'{args.model}: {computed} of {points.size} points computed, results in {args.out}')
+    return 0
+
+
+def _bench(args):
+    if args.compare:
+        rows = benchmark.compare_runs(benchmark.load_run(args.compare[0]), benchmark.load_run(args.compare[1]),
+                                      threshold=args.threshold)
+        for row in rows:
+            print(benchmark.format_comparison(row))
+        regressions = sum(row['regression'] for row in rows)
+        print(f'{regressions} regression(s) over {args.threshold:.0%} in {len(rows)} comparisons')
+        return 1 if regressions else 0
+
+    cases = args.cases.split(',') if args.cases else None
+    unknown = [name for name in cases or () if name not in benchmark.CASES]
+    if unknown:
+        raise ValueError(f"unknown case(s) {', '.join(unknown)}; expected some of {', '.join(benchmark.CASES)}")
+    sizes = [int(float(x)) for x in args.sizes.split(',')] if args.sizes else benchmark.SIZES
+    run = benchmark.run_benchmarks(cases, sizes, repeat=args.repeat,
+                                   progress=lambda r: print(benchmark.format_result(r), flush=True))
+    if args.out:
+        benchmark.save_run(run, args.out)
+    return 0
+
+
+def _uncertainty(args):
+    inputs = {}
+    for item in args.vary:
+        name, sep, spec = item.partition('=')
+        if not sep:
+            raise SystemExit(f'--vary expects NAME=DIST:PARAMS, got {item!r}')
+        inputs[name.strip()] = spec
+    fixed = _fixed_values(args.set)
+    outputs = args.outputs.split(',') if args.outputs else None
+    result = uncertainty.propagate(args.model, inputs, fixed=fixed, outputs=outputs,
+                                   n_samples=int(float(args.samples)), chunk_size=args.chunk_size,
+                                   seed=args.seed, max_workers=args.workers)
+    print(uncertainty.format_summary(result))
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(result, f, indent=1)
+    return 0
+
+
+def _explore(args):
+    from .explorer import explore
+
+    explore(args.view, **_fixed_values(args.set))
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m ice', description='ICE project models from the command line')
+    parser.add_argument('--report', metavar='PATH',
+                        help='time the model stages of the command, print the table and save it as JSON')
+    parser.add_argument('--profile', action='store_true', help='add the top cProfile functions to --report')
+    parser.add_argument('--memory', action='store_true', help='add the tracemalloc peak and sites to --report')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    study = commands.add_parser(
+        'study', help='evaluate a model over many operating points',
+        description='Evaluate a model over operating points from a CSV/JSON file or a Cartesian grid. '
+                    'Reruns with the same arguments resume from the checkpoint.')
+    study.add_argument('model', choices=list(MODELS))
+    study.add_argument('--points', help='CSV or JSON file of operating points (JSON may hold a grid spec)')
+    study.add_argument('--grid', action='append', default=[], metavar='NAME=VALUES',
+                       help='grid axis, START:STOP:NUM or comma-separated values (repeatable)')
+    study.add_argument('--set', action='append', default=[], metavar='NAME=VALUE',
+                       help='parameter shared by every point (repeatable)')
+    study.add_argument('-o', '--out', required=True, help='output .csv file or .parquet directory')
+    study.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    study.add_argument('--workers', type=int, default=None, help='worker processes (1 runs in-process)')
+    study.add_argument('--checkpoint', help='checkpoint file (default: OUT.checkpoint.json)')
+    study.set_defaults(func=_study)
+
+    bench = commands.add_parser(
+        'bench', help='time the model hot paths over input sizes',
+        description='Time each benchmark case at sizes 10^3-10^7 (wall time and peak memory), '
+                    'or compare two saved runs and flag regressions.')
+    bench.add_argument('--cases', help=f"comma-separated subset of: {', '.join(benchmark.CASES)}")
+    bench.add_argument('--sizes', help='comma-separated sizes, e.g. 1e3,1e5 (default 1e3 to 1e7)')
+    bench.add_argument('--repeat', type=int, default=3, help='timed repeats per size (best is kept)')
+    bench.add_argument('-o', '--out', help='save the run as JSON')
+    bench.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'), help='compare two saved runs')
+    bench.add_argument('--threshold', type=float, default=benchmark.REGRESSION_THRESHOLD,
+                       help='slowdown fraction counted as a regression (default 0.10)')
+    bench.set_defaults(func=_bench)
+
+    mc = commands.add_parser(
+        'uncertainty', help='Monte Carlo propagation of input uncertainty through a model',
+        description='Draw samples of the uncertain inputs, run them through a study model in chunks, '
+                    'and report means, percentiles and sensitivity indices of its outputs.')
+    mc.add_argument('model', choices=list(MODELS))
+    mc.add_argument('--vary', action='append', default=[], metavar='NAME=DIST:PARAMS',
+                    help='uncertain input, e.g. rc=normal:14:0.3, T1=uniform:290:310, '
+                         'rp=triangular:1.5:1.7:1.9 or k=lognormal:MU:SIGMA (repeatable)')
+    mc.add_argument('--set', action='append', default=[], metavar='NAME=VALUE',
+                    help='fixed parameter (repeatable)')
+    mc.add_argument('--outputs', help='comma-separated output columns (default: eta, P_max, T_max '
+                                      'for cycles, mdot, velocity for throat_flow)')
+    mc.add_argument('-n', '--samples', default='1e6', help='number of samples (default 1e6)')
+    mc.add_argument('--chunk-size', type=int, default=uncertainty.CHUNK_SIZE)
+    mc.add_argument('--seed', type=int, default=None)
+    mc.add_argument('--workers', type=int, default=None, help='worker processes (1 runs in-process)')
+    mc.add_argument('-o', '--out', help='save the statistics as JSON')
+    mc.set_defaults(func=_uncertainty)
+
+    explore = commands.add_parser(
+        'explore', help='interactive diagram with sliders',
+        description='Open the comparison, Atkinson or valve-lift diagram with sliders for its parameters.')
+    explore.add_argument('view', choices=['comparison', 'atkinson', 'valve_lift'])
+    explore.add_argument('--set', action='append', default=[], metavar='NAME=VALUE',
+                         help='initial slider value, e.g. rc=12 (repeatable)')
+    explore.set_defaults(func=_explore)
+
+    args = parser.parse_args(argv)
+    if (args.profile or args.memory) and not args.report:
+        parser.error('--profile and --memory need --report PATH')
+    try:
+        if not args.report:
+            return args.func(args)
+        with instrument.instrument(cprofile=args.profile, memory=args.memory):
+            status = args.func(args)
+    except ValueError as error:
+        parser.error(str(error))
+    data = instrument.report()
+    print(instrument.format_report(data))
+    instrument.save_report(args.report, data)
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,262 @@
+# Temperature-dependent properties of air from NASA 7-coefficient polynomials.
+#
+# Everything the cycle calculations need is tabulated once at import on a fine
+# temperature grid: cp(T), u(T), h(T), the standard-state entropy s0(T), and
+# phi(T) = s0/R - ln(T), whose differences give isentropic volume ratios. Cycle states then
+# come from np.interp on these tables (forwards or inverted), so the variable-property
+# cycles vectorize like the constant-k ones instead of needing a nonlinear solve per point.
+# Lookups outside the 200-3500 K table give NaN rather than clamping to its edge.
+
+import numpy as np
+
+from .cycles import T_MAX, _result, default_cutoff_ratio
+from .thermo import P1, T1
+
+R_UNIVERSAL = 8.314462618  # kJ/kmol.K
+
+# Dry air as N2, O2 and Ar (CO2 folded into Ar): mole fractions and molar masses (kg/kmol)
+AIR_COMPOSITION = {
+    'N2': (0.78084, 28.0134),
+    'O2': (0.20947, 31.9988),
+    'Ar': (0.00969, 39.948),
+}
+
+# NASA polynomial coefficients a1..a7 (GRI-Mech 3.0) for 200/300-1000 K and 1000-3500 K:
+# cp/R = a1 + a2*T + a3*T^2 + a4*T^3 + a5*T^4
+NASA_COEFFICIENTS = {
+    'N2': (
+        (3.298677, 1.4082404e-03, -3.963222e-06, 5.641515e-09, -2.444854e-12, -1020.8999, 3.950372),
+        (2.92664, 1.4879768e-03, -5.68476e-07, 1.0097038e-10, -6.753351e-15, -922.7977, 5.980528),
+    ),
+    'O2': (
+        (3.78245636, -2.99673416e-03, 9.84730201e-06, -9.68129509e-09, 3.24372837e-12,
+         -1063.94356, 3.65767573),
+        (3.28253784, 1.48308754e-03, -7.57966669e-07, 2.09470555e-10, -2.16717794e-14,
+         -1088.45772, 5.45323129),
+    ),
+    'Ar': (
+        (2.5, 0.0, 0.0, 0.0, 0.0, -745.375, 4.366),
+        (2.5, 0.0, 0.0, 0.0, 0.0, -745.375, 4.366),
+    ),
+}
+
+T_SWITCH = 1000.0  # K, boundary between the two coefficient sets
+T_TABLE_MIN = 200.0
+T_TABLE_MAX = 3500.0
+T_TABLE_STEP = 0.5
+
+M_AIR = sum(x * M for x, M in AIR_COMPOSITION.values())
+R_AIR = R_UNIVERSAL / M_AIR  # kJ/kg.K
+
+
+def _nasa_dimensionless(T, a):
+    # cp/R, h/(R*T) and s0/R of one species for one coefficient set
+    cp = a[0] + a[1] * T + a[2] * T**2 + a[3] * T**3 + a[4] * T**4
+    h = a[0] + a[1] * T / 2 + a[2] * T**2 / 3 + a[3] * T**3 / 4 + a[4] * T**4 / 5 + a[5] / T
+    s = a[0] * np.log(T) + a[1] * T + a[2] * T**2 / 2 + a[3] * T**3 / 3 + a[4] * T**4 / 4 + a[6]
+    return cp, h, s
+
+
+def nasa_air_properties(T):
+    """cp, h, u (kJ/kg, kJ/kg.K) and s0 (kJ/kg.K) of air evaluated directly from the polynomials.
+
+    This is the exact (slow) path used to build the tables; s0 excludes the mixing term,
+    which is constant and cancels in every cycle calculation.
+    """
+    T = np.asarray(T, dtype=float)
+    cp = np.zeros_like(T)
+    h = np.zeros_like(T)
+    s = np.zeros_like(T)
+    for species, (x, _) in AIR_COMPOSITION.items():
+        low, high = NASA_COEFFICIENTS[species]
+        cp_lo, h_lo, s_lo = _nasa_dimensionless(T, low)
+        cp_hi, h_hi, s_hi = _nasa_dimensionless(T, high)
+        use_low = T < T_SWITCH
+        cp += x * np.where(use_low, cp_lo, cp_hi)
+        h += x * np.where(use_low, h_lo, h_hi)
+        s += x * np.where(use_low, s_lo, s_hi)
+    return {
+        'cp': cp * R_AIR,
+        'h': h * R_AIR * T,
+        'u': (h - 1) * R_AIR * T,
+        's0': s * R_AIR,
+    }
+
+
+# --- Precomputed tables ---
+T_TABLE = np.arange(T_TABLE_MIN, T_TABLE_MAX + T_TABLE_STEP / 2, T_TABLE_STEP)
+_props = nasa_air_properties(T_TABLE)
+CP_TABLE = _props['cp']
+H_TABLE = _props['h']
+U_TABLE = _props['u']
+S0_TABLE = _props['s0']
+PHI_TABLE = S0_TABLE / R_AIR - np.log(T_TABLE)
+del _props
+
+
+def _lookup(x, xp, fp):
+    # Table interpolation that gives NaN instead of the end value outside the table
+    return np.interp(x, xp, fp, left=np.nan, right=np.nan)
+
+
+def cp_air(T):
+    """cp (kJ/kg.K) at T (K); NaN outside the table range T_TABLE_MIN..T_TABLE_MAX.
+
+    This and the other table lookups below return NaN for inputs beyond the table (a
+    temperature outside 200-3500 K, or the u, h, phi or s0 such a temperature would have)
+    rather than the value at its edge, so an out-of-range state shows up in the results.
+    """
+    return _lookup(T, T_TABLE, CP_TABLE)
+
+
+def cv_air(T):
+    return cp_air(T) - R_AIR
+
+
+def h_air(T):
+    return _lookup(T, T_TABLE, H_TABLE)
+
+
+def u_air(T):
+    return _lookup(T, T_TABLE, U_TABLE)
+
+
+def s0_air(T):
+    return _lookup(T, T_TABLE, S0_TABLE)
+
+
+def T_from_u(u):
+    # NaN for u beyond the table, as in cp_air
+    return _lookup(u, U_TABLE, T_TABLE)
+
+
+def T_from_h(h):
+    return _lookup(h, H_TABLE, T_TABLE)
+
+
+def isentropic_T_from_volume_ratio(T_start, v_ratio):
+    """Temperature after an isentropic change to v_end/v_start = ``v_ratio``.
+
+    With P = RT/v, s = const gives phi(T_end) = phi(T_start) - ln(v_ratio). NaN where
+    T_start or the end temperature falls outside the table.
+    """
+    phi = _lookup(T_start, T_TABLE, PHI_TABLE) - np.log(v_ratio)
+    return _lookup(phi, PHI_TABLE, T_TABLE)
+
+
+def isentropic_T_from_pressure_ratio(T_start, P_ratio):
+    # s0(T_end) = s0(T_start) + R ln(P_end/P_start); NaN outside the table as above
+    s0 = _lookup(T_start, T_TABLE, S0_TABLE) + R_AIR * np.log(P_ratio)
+    return _lookup(s0, S0_TABLE, T_TABLE)
+
+
+# --- Variable-property air-standard cycles ---
+# Same states and result dicts as ice.cycles, with cp, cv and k following T. Inputs and
+# states are limited to the table range, T_TABLE_MIN to T_TABLE_MAX.
+
+def _compression(rc, P1, T1):
+    v1 = R_AIR * T1 / P1
+    v2 = v1 / rc
+    T2 = isentropic_T_from_volume_ratio(T1, 1 / rc)
+    P2 = P1 * rc * T2 / T1
+    return v1, v2, P2, T2
+
+
+def _expansion(P_start, T_start, v_start, v_end):
+    T_end = isentropic_T_from_volume_ratio(T_start, v_end / v_start)
+    P_end = P_start * (T_end / T_start) * (v_start / v_end)
+    return P_end, T_end
+
+
+def otto_cycle_variable(rc, qin, P1=P1, T1=T1):
+    """Otto cycle states 1-4 with temperature-dependent air; T3 solves u3 = u2 + qin."""
+    rc, qin, P1, T1 = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (rc, qin, P1, T1)))
+    v1, v2, P2, T2 = _compression(rc, P1, T1)
+
+    v3 = v2
+    T3 = T_from_u(u_air(T2) + qin)
+    P3 = P2 * (T3 / T2)
+
+    v4 = v1
+    P4, T4 = _expansion(P3, T3, v3, v4)
+
+    qout = u_air(T4) - u_air(T1)
+    return _result((P1, P2, P3, P4), (v1, v2, v3, v4), (T1, T2, T3, T4), qin, qout)
+
+
+def diesel_cycle_variable(rc, qin, P1=P1, T1=T1):
+    """Diesel cycle states 1-4 with temperature-dependent air; T3 solves h3 = h2 + qin."""
+    rc, qin, P1, T1 = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (rc, qin, P1, T1)))
+    v1, v2, P2, T2 = _compression(rc, P1, T1)
+
+    P3 = P2
+    T3 = T_from_h(h_air(T2) + qin)
+    alpha = T3 / T2
+    v3 = v2 * alpha
+
+    v4 = v1
+    P4, T4 = _expansion(P3, T3, v3, v4)
+
+    qout = u_air(T4) - u_air(T1)
+    result = _result((P1, P2, P3, P4), (v1, v2, v3, v4), (T1, T2, T3, T4), qin, qout)
+    result['alpha'] = alpha
+    return result
+
+
+def dual_cycle_variable(rc, rp, alpha=None, P1=P1, T1=T1, T_max=T_MAX):
+    """Dual cycle states 1-5 with temperature-dependent air; arguments as ``ice.cycles.dual_cycle``.
+
+    Heat input is u3 - u2 + h4 - h3 from the tables rather than cv and cp times the
+    temperature rises.
+    """
+    if alpha is None:
+        alpha = default_cutoff_ratio(rc)
+    rc, rp, alpha, P1, T1, T_max = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (rc, rp, alpha, P1, T1, T_max)))
+    v1, v2, P2, T2 = _compression(rc, P1, T1)
+
+    v3 = v2
+    P3 = rp * P2
+    T3 = rp * T2
+
+    P4 = P3
+    T4_calc = T3 * alpha
+    limited = T4_calc > T_max
+    T4 = np.where(limited, T_max, T4_calc)
+    v4 = v3 * (T4 / T3)
+
+    v5 = v1
+    P5, T5 = _expansion(P4, T4, v4, v5)
+
+    qin = u_air(T3) - u_air(T2) + h_air(T4) - h_air(T3)
+    qout = u_air(T5) - u_air(T1)
+    result = _result((P1, P2, P3, P4, P5), (v1, v2, v3, v4, v5), (T1, T2, T3, T4, T5), qin, qout)
+    result['alpha'] = T4 / T3
+    result['T_max_limited'] = limited
+    result['valid'] = T3 <= T_max
+    return result
+
+
+def atkinson_cycle_variable(rc, re, P1=P1, T1=T1):
+    """Atkinson cycle states 1-4 with temperature-dependent air; see ``ice.cycles.atkinson_cycle``."""
+    rc, re, P1, T1 = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (rc, re, P1, T1)))
+    v1, v2, P2, T2 = _compression(rc, P1, T1)
+
+    P4 = P1
+    v4 = re * v2
+    T4 = T1 * (v4 / v1)
+
+    # Expansion 3-4 is isentropic over v4/v3 = re, so go back from state 4
+    v3 = v2
+    T3 = isentropic_T_from_volume_ratio(T4, 1 / re)
+    P3 = P4 * (T3 / T4) * re
+
+    qin = u_air(T3) - u_air(T2)
+    qout = h_air(T4) - h_air(T1)
+    valid = re > rc
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = _result((P1, P2, P3, P4), (v1, v2, v3, v4), (T1, T2, T3, T4), qin, qout)
+        result['eta'] = np.where(valid, result['eta'], np.nan)
+        result['mep'] = np.where(valid, result['w_net'] / (v4 - v2), np.nan)
+    result['valid'] = valid
+    return result
@@ -0,0 +1,208 @@
+# Benchmarks of the model hot paths over a range of input sizes.
+#
+# Each case has a setup function that builds its inputs for a size n (outside the timed
+# region) and returns the call to time. Wall time is the best of several repeats; peak
+# memory is measured in one extra run under tracemalloc, which NumPy reports its buffers to,
+# so the timing runs are not slowed down by tracing. Results are plain JSON so two runs can
+# be compared later.
+
+import json
+import platform
+import time
+import tracemalloc
+
+import numpy as np
+
+from .cam_timing import (EVC, EVO, IVC, IVO, L_MAX, LOBE_PERIOD, OVERLAP_THRESHOLD, cam_timing_sweep,
+                         overlap_regions)
+from .cycles import atkinson_cycle, compare_cycles, otto_cycle
+from .pv_loop import loop_integral
+from .thermo import isentropic_curves, isentropic_process
+from .throat_flow import throat_flow
+from .valve_lift import combined_lift
+
+SIZES = (10**3, 10**4, 10**5, 10**6, 10**7)
+REGRESSION_THRESHOLD = 0.10
+
+def _lift_events(valve_open, valve_close, l_max):
+    # The two lobes per valve of calculate_sinusoidal_lift in the lift script
+    duration = (valve_close - valve_open) % LOBE_PERIOD
+    return np.array([[valve_open, valve_close, duration, l_max],
+                     [valve_open + 360, valve_close + 360, duration, l_max]])
+
+
+def _setup_lift(n):
+    theta = np.linspace(0, 720, n)
+    events = _lift_events(IVO, IVC, L_MAX)
+    return lambda: combined_lift(theta, events)
+
+
+def _setup_overlap(n):
+    theta = np.linspace(0, 720, n)
+    intake = combined_lift(theta, _lift_events(IVO, IVC, L_MAX))
+    exhaust = combined_lift(theta, _lift_events(EVO, EVC, L_MAX))
+    return lambda: overlap_regions(np.minimum(intake, exhaust) > OVERLAP_THRESHOLD)
+
+
+def _setup_cam_sweep(n):
+    # n lift samples in total: timings x 3600 angles at the default 0.1 deg resolution
+    n_timings = max(n // 3600, 1)
+    EVC_sweep = np.linspace(EVC - 20, EVC + 20, n_timings)
+    return lambda: cam_timing_sweep(IVO, IVC, EVO, EVC_sweep, L_MAX)
+
+
+def _setup_throat_flow(n):
+    Pt = np.linspace(100e3, 1000e3, n)
+    return lambda: throat_flow(Pt, 300.0, 101325.0, 0.001)
+
+
+def _setup_isentropic_process(n):
+    return lambda: isentropic_process(100.0, 0.8613, 4023.0, 0.0615, num_points=n)
+
+
+def _setup_isentropic_curves(n):
+    # n samples in total: batches of 100-point curves
+    P_start = np.linspace(100.0, 200.0, max(n // 100, 1))
+    return lambda: isentropic_curves(P_start, 0.8613, 0.0615, num_points=100)
+
+
+def _setup_compare_cycles(n):
+    rc = np.linspace(8, 20, n)
+    return lambda: compare_cycles(rc, 1.7)
+
+
+def _setup_atkinson(n):
+    re = np.linspace(15, 25, n)
+    return lambda: atkinson_cycle(14, re)
+
+
+def _setup_loop_integral(n):
+    # Net work of n Otto loops at the default curve tolerance
+    result = otto_cycle(np.linspace(8, 20, n), 1800.0)
+    return lambda: loop_integral(result, 'otto')
+
+
+def _setup_render(n):
+    # Draw an n-sample lift curve on a reused Agg figure, as the batch renderer does
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(14, 7))
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    line, = ax.plot([], [])
+    ax.set_xlim(0, 720)
+    ax.set_ylim(0, 10)
+    theta = np.linspace(0, 720, n)
+    lift = _setup_lift(n)()
+
+    def render():
+        line.set_data(theta, lift)
+        canvas.draw()
+    return render
+
+
+# Case name -> (setup, largest size worth running). compare_cycles keeps ~40 state arrays,
+# which at 10^7 points no longer fits in a few GB of memory.
+CASES = {
+    'valve_lift': (_setup_lift, 10**7),
+    'overlap_regions': (_setup_overlap, 10**7),
+    'cam_timing_sweep': (_setup_cam_sweep, 10**7),
+    'throat_flow': (_setup_throat_flow, 10**7),
+    'isentropic_process': (_setup_isentropic_process, 10**7),
+    'isentropic_curves': (_setup_isentropic_curves, 10**7),
+    'compare_cycles': (_setup_compare_cycles, 10**6),
+    'atkinson_cycle': (_setup_atkinson, 10**7),
+    'loop_integral': (_setup_loop_integral, 10**6),
+    'render_lift': (_setup_render, 10**6),
+}
+
+
+def measure(call, repeat=3):
+    """Best wall time (s) over ``repeat`` calls and peak traced memory (bytes) of one call."""
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        call()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def run_benchmarks(cases=None, sizes=SIZES, repeat=3, progress=None):
+    """Time every case at every size up to its limit; returns a JSON-ready dict."""
+    results = []
+    for name in cases or CASES:
+        setup, max_size = CASES[name]
+        for n in sizes:
+            if n > max_size:
+                continue
+            wall, peak = measure(setup(n), repeat)
+            results.append({'case': name, 'size': int(n), 'time': wall, 'peak_bytes': int(peak)})
+            if progress:
+                progress(results[-1])
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.platform(),
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+
+
+def compare_runs(baseline, current, threshold=REGRESSION_THRESHOLD):
+    """Per (case, size) time ratios of ``current`` over ``baseline`` (both run dicts).
+
+    Returns a list of dicts with case, size, both times and peaks, the time ratio and
+    ``regression``, which is True where the current run is more than ``threshold``
+    (fractional) slower or needs that much more peak memory.
+    """
+    old = {(r['case'], r['size']): r for r in baseline['results']}
+    rows = []
+    for r in current['results']:
+        base = old.get((r['case'], r['size']))
+        if base is None:
+            continue
+        ratio = r['time'] / base['time']
+        memory_ratio = r['peak_bytes'] / max(base['peak_bytes'], 1)
+        rows.append({
+            'case': r['case'],
+            'size': r['size'],
+            'baseline_time': base['time'],
+            'time': r['time'],
+            'ratio': ratio,
+            'baseline_peak_bytes': base['peak_bytes'],
+            'peak_bytes': r['peak_bytes'],
+            'memory_ratio': memory_ratio,
+            'regression': ratio > 1 + threshold or memory_ratio > 1 + threshold,
+        })
+    return rows
+
+
+def format_result(r):
+    return f"{r['case']:<20} n={r['size']:<10,d} {r['time'] * 1e3:10.3f} ms {r['peak_bytes'] / 2**20:10.2f} MiB"
+
+
+def format_comparison(row):
+    flag = '  REGRESSION' if row['regression'] else ''
+    return (f"{row['case']:<20} n={row['size']:<10,d} {row['baseline_time'] * 1e3:10.3f} ms -> "
+            f"{row['time'] * 1e3:10.3f} ms  x{row['ratio']:.2f}  memory x{row['memory_ratio']:.2f}{flag}")
+
+
+def load_run(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_run(run, path):
+    with open(path, 'w') as f:
+        json.dump(run, f, indent=1)
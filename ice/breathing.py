@@ -0,0 +1,152 @@
+import numpy as np
+
+from . import cam_timing
+from .engine_geometry import BORE, CONROD, RC, STROKE, cylinder_volume, displacement_volume
+from .instrument import array_size, timed
+from .throat_flow import R_AIR, throat_flow
+from .valve_lift import valve_lift
+
+# Valve events within one 720-degree cycle, firing TDC at 0 and gas-exchange TDC at 360.
+# These are the physical lobes of the lift script's timing (ice.cam_timing): IVO at 15 deg
+# BTDC (345), IVC at 35 deg ABDC (540 + 35), EVO at 45 deg BBDC (180 - 45) and EVC at
+# 10 deg ATDC (360 + 10).
+IVO = cam_timing.IVO
+IVC = cam_timing.IVC + cam_timing.LOBE_PERIOD
+EVO = cam_timing.EVO - cam_timing.LOBE_PERIOD
+EVC = cam_timing.EVC + cam_timing.LOBE_PERIOD
+
+# Valve head diameters (m) and discharge coefficient of the valve curtain
+D_INTAKE = 0.040
+D_EXHAUST = 0.034
+CD_VALVE = 0.7
+
+
+def valve_flow_area(lift, d_valve, Cd=CD_VALVE):
+    """Effective flow area (m^2) for a valve lift in m.
+
+    The curtain area pi*d*L is used until it reaches the port area pi*d^2/4.
+    """
+    lift = np.asarray(lift, dtype=float)
+    curtain = np.pi * d_valve * lift
+    return Cd * np.minimum(curtain, np.pi / 4 * np.asarray(d_valve, dtype=float)**2)
+
+
+def _orifice_flow(P_a, T_a, P_b, T_b, area, gamma, R):
+    # Signed mass flow (kg/s) from side a to side b, with upstream temperature
+    forward = P_a >= P_b
+    P_up = np.where(forward, P_a, P_b)
+    T_up = np.where(forward, T_a, T_b)
+    P_dn = np.where(forward, P_b, P_a)
+    mdot = throat_flow(P_up, T_up, P_dn, area, gamma=gamma, R=R)['mdot']
+    return np.where(forward, mdot, -mdot), T_up
+
+
+@timed('flow_loop', samples=array_size('trapped_mass'))
+def breathing_map(rpm, IVO=IVO, IVC=IVC, EVO=EVO, EVC=EVC, l_max=9.0,
+                  d_intake=D_INTAKE, d_exhaust=D_EXHAUST, Cd=CD_VALVE,
+                  P_intake=100e3, T_intake=300.0, P_exhaust=105e3, T_exhaust=800.0,
+                  P_evo=350e3, T_evo=1100.0, bore=BORE, stroke=STROKE, conrod=CONROD, rc=RC,
+                  gamma=1.4, R=R_AIR, d_theta=0.5, history=True):
+    """Crank-angle resolved gas exchange for a whole rpm x valve-timing sweep.
+
+    Every argument broadcasts, so e.g. ``rpm[:, None]`` with ``IVC[None, :]`` evaluates a
+    full (rpm, IVC) breathing map in one call. Valve angles are in deg on the 720-degree
+    cycle above, l_max in mm, pressures in Pa and temperatures in K.
+
+    The cylinder is a single adiabatic zone filled and emptied through the intake and
+    exhaust valves, each treated as a quasi-steady orifice (``throat_flow``) with the
+    effective area from ``valve_flow_area``. Integration uses a fixed step of ``d_theta``
+    deg from the earliest exhaust opening, where the cylinder is at (P_evo, T_evo), to the
+    latest intake closing; all operating points advance together.
+
+    Returns a dict with trapped_mass (kg), inducted_mass (kg, net intake flow),
+    volumetric_efficiency (inducted mass over intake density times displacement) and
+    residual_fraction. With ``history=True`` it also holds theta (deg) and, with an extra
+    trailing angle axis, mdot_intake and mdot_exhaust (kg/s, positive into and out of the
+    cylinder), cylinder_mass (kg) and cylinder_pressure (Pa).
+    """
+    args = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (
+        rpm, IVO, IVC, EVO, EVC, l_max, d_intake, d_exhaust, Cd, P_intake, T_intake,
+        P_exhaust, T_exhaust, P_evo, T_evo, bore, stroke, conrod, rc, gamma)))
+    (rpm, IVO, IVC, EVO, EVC, l_max, d_intake, d_exhaust, Cd, P_intake, T_intake,
+     P_exhaust, T_exhaust, P_evo, T_evo, bore, stroke, conrod, rc, gamma) = args
+    shape = rpm.shape
+
+    cv = R / (gamma - 1)
+    cp = gamma * cv
+
+    # Angles are carried on the unwrapped axis so an event like EVO=135 -> IVC=575 is
+    # one continuous window
+    theta_start = float(EVO.min())
+    theta_end = float(np.max(np.where(IVC < EVO, IVC + 720, IVC)))
+    n_steps = int(np.ceil((theta_end - theta_start) / d_theta))
+    theta = theta_start + d_theta * np.arange(n_steps + 1)
+    dt = d_theta / (6 * rpm)
+
+    V = cylinder_volume(theta_start, bore, stroke, conrod, rc)
+    m = P_evo * V / (R * T_evo)
+    T = T_evo.copy()
+    inducted = np.zeros(shape)
+    exhausted_fresh = np.zeros(shape)
+
+    if history:
+        mdot_in_hist = np.zeros(shape + (n_steps + 1,))
+        mdot_ex_hist = np.zeros(shape + (n_steps + 1,))
+        m_hist = np.empty(shape + (n_steps + 1,))
+        P_hist = np.empty(shape + (n_steps + 1,))
+        m_hist[..., 0] = m
+        P_hist[..., 0] = P_evo
+
+    for i in range(n_steps):
+        angle = theta[i]
+        V_next = cylinder_volume(theta[i + 1], bore, stroke, conrod, rc)
+        P = m * R * T / V
+
+        A_in = valve_flow_area(valve_lift(angle, IVO, IVC, l_max) * 1e-3, d_intake, Cd)
+        A_ex = valve_flow_area(valve_lift(angle, EVO, EVC, l_max) * 1e-3, d_exhaust, Cd)
+
+        mdot_in, T_in = _orifice_flow(P_intake, T_intake, P, T, A_in, gamma, R)
+        mdot_ex, T_ex = _orifice_flow(P, T, P_exhaust, T_exhaust, A_ex, gamma, R)
+
+        # Never let one step carry more mass than it takes to equalize the pressures,
+        # which keeps the explicit step stable as the flow approaches zero
+        dm_in = np.clip(mdot_in * dt, -np.abs(P - P_intake) * V / (R * T),
+                        np.abs(P_intake - P) * V / (R * T_intake))
+        dm_ex = np.clip(mdot_ex * dt, -np.abs(P_exhaust - P) * V / (R * T_exhaust),
+                        np.abs(P - P_exhaust) * V / (R * T))
+
+        # First law for the open cylinder: dU = h_in*dm_in - h_out*dm_out - P*dV
+        U = m * cv * T + cp * T_in * dm_in - cp * T_ex * dm_ex - P * (V_next - V)
+        m_new = m + dm_in - dm_ex
+        T = U / (m_new * cv)
+
+        inducted += dm_in
+        # Fresh charge lost straight to the exhaust, in proportion to its share of the cylinder
+        fresh_share = np.clip(inducted / m_new, 0.0, 1.0)
+        exhausted_fresh += np.maximum(dm_ex, 0.0) * fresh_share
+        m = m_new
+        V = V_next
+
+        if history:
+            mdot_in_hist[..., i] = dm_in / dt
+            mdot_ex_hist[..., i] = dm_ex / dt
+            m_hist[..., i + 1] = m
+            P_hist[..., i + 1] = m * R * T / V
+
+    rho_intake = P_intake / (R * T_intake)
+    fresh_trapped = np.clip(inducted - exhausted_fresh, 0.0, None)
+    result = {
+        'trapped_mass': m,
+        'inducted_mass': inducted,
+        'volumetric_efficiency': inducted / (rho_intake * displacement_volume(bore, stroke)),
+        'residual_fraction': 1 - np.clip(fresh_trapped / m, 0.0, 1.0),
+    }
+    if history:
+        result.update({
+            'theta': theta,
+            'mdot_intake': mdot_in_hist,
+            'mdot_exhaust': mdot_ex_hist,
+            'cylinder_mass': m_hist,
+            'cylinder_pressure': P_hist,
+        })
+    return result
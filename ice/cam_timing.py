@@ -0,0 +1,112 @@
+import numpy as np
+
+from .instrument import array_size, timed
+from .valve_lift import valve_lift
+
+# In the valve-lift script every lobe repeats each 360 deg of crank angle
+# (two intake and two exhaust lobes in the 720-degree diagram), so the sweep
+# works on one 360-degree period by default.
+LOBE_PERIOD = 360.0
+
+# Minimum lift (mm) for both valves to count as open, as in the lift diagram
+OVERLAP_THRESHOLD = 0.01
+
+# Valve timing of the lift script (deg) and its max lift (mm): IVO 15 deg BTDC, IVC 35 deg
+# ABDC, EVO 45 deg BBDC (540 - 45) and EVC 10 deg ATDC. On the lobe period EVO = 495 is
+# the same angle as 135 and EVC = 10 the same as 370.
+IVO = 345.0
+IVC = 215.0
+EVO = 495.0
+EVC = 10.0
+L_MAX = 9.0
+
+
+@timed('overlap', samples=lambda result: result[0].size)
+def overlap_regions(overlap_mask):
+    """Start and end indices (inclusive) of each run of True values in a 1-D mask."""
+    mask = np.asarray(overlap_mask, dtype=bool)
+    edges = np.diff(np.concatenate(([False], mask, [False])).astype(np.int8))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1) - 1
+    return starts, ends
+
+
+@timed('overlap', samples=array_size('overlap_duration'))
+def cam_timing_sweep(IVO, IVC, EVO, EVC, l_max, resolution=0.1, period=LOBE_PERIOD,
+                     threshold=OVERLAP_THRESHOLD, chunk_size=1024):
+    """Valve-overlap metrics for many cam timings at once.
+
+    IVO, IVC, EVO, EVC (deg) and l_max (mm) broadcast to a common shape; each element is
+    one cam timing. Lift is evaluated on a uniform grid over one lobe period for a block of
+    ``chunk_size`` timings at a time, as a single (timings x angles) broadcast.
+
+    The overlap_* results describe the valve overlap around TDC: the region that begins
+    once the intake opens (after IVO) while the exhaust is still open (before EVC).
+    overlap_start lies in [0, period) and overlap_end = overlap_start + overlap_duration,
+    so it can exceed ``period`` when the overlap straddles the wrap point. Timings without
+    such an overlap get zero duration/area and NaN angles. total_overlap_duration and
+    total_overlap_area cover every region where both valves are open, as shaded in the
+    lift diagram. Durations are in deg and areas in mm*deg.
+    """
+    IVO, IVC, EVO, EVC, l_max = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (IVO, IVC, EVO, EVC, l_max)))
+    shape = IVO.shape
+    IVO, IVC, EVO, EVC, l_max = (x.ravel() for x in (IVO, IVC, EVO, EVC, l_max))
+    n = IVO.size
+
+    n_angles = int(round(period / resolution))
+    d_theta = period / n_angles
+    theta = np.arange(n_angles) * d_theta
+    steps = np.arange(n_angles)
+
+    duration = np.zeros(n)
+    area = np.zeros(n)
+    start = np.full(n, np.nan)
+    end = np.full(n, np.nan)
+    total_duration = np.empty(n)
+    total_area = np.empty(n)
+
+    for lo in range(0, n, chunk_size):
+        sl = slice(lo, min(lo + chunk_size, n))
+        intake = valve_lift(theta, IVO[sl, None], IVC[sl, None], l_max[sl, None], cycle=period)
+        exhaust = valve_lift(theta, EVO[sl, None], EVC[sl, None], l_max[sl, None], cycle=period)
+        overlap = np.minimum(intake, exhaust, out=intake)
+        overlap[overlap <= threshold] = 0.0
+
+        # The grid is periodic and uniform, so a plain sum is the trapezoid rule
+        total_duration[sl] = np.count_nonzero(overlap, axis=1) * d_theta
+        total_area[sl] = overlap.sum(axis=1) * d_theta
+
+        # Re-order every row to start at the first grid angle at or after IVO
+        i_open = np.ceil(np.mod(IVO[sl], period) / d_theta).astype(np.intp) % n_angles
+        rolled = np.take_along_axis(overlap, (i_open[:, None] + steps) % n_angles, axis=1)
+        mask = rolled > 0.0
+
+        # First open sample after IVO, then the first closed sample after that
+        offset = np.argmax(mask, axis=1)
+        after = steps >= offset[:, None]
+        closed = after & ~mask
+        stop = np.where(closed.any(axis=1), np.argmax(closed, axis=1), n_angles)
+        run = stop - offset
+
+        # Only a region that starts while the exhaust is still open is the TDC overlap
+        exhaust_open_at_ivo = (np.mod(IVO[sl] - EVO[sl], period)
+                               <= np.mod(EVC[sl] - EVO[sl], period))
+        to_evc = np.mod(EVC[sl] - IVO[sl], period)
+        found = mask.any(axis=1) & exhaust_open_at_ivo & (offset * d_theta <= to_evc)
+
+        region = after & (steps < stop[:, None])
+        duration[sl] = np.where(found, run * d_theta, 0.0)
+        area[sl] = np.where(found, np.where(region, rolled, 0.0).sum(axis=1) * d_theta, 0.0)
+        first = np.mod(i_open + offset, n_angles) * d_theta
+        start[sl] = np.where(found, first, np.nan)
+        end[sl] = np.where(found, first + run * d_theta, np.nan)
+
+    return {
+        'overlap_duration': duration.reshape(shape),
+        'overlap_area': area.reshape(shape),
+        'overlap_start': start.reshape(shape),
+        'overlap_end': end.reshape(shape),
+        'total_overlap_duration': total_duration.reshape(shape),
+        'total_overlap_area': total_area.reshape(shape),
+    }
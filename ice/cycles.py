@@ -0,0 +1,216 @@
+from functools import lru_cache
+
+import numpy as np
+
+from .instrument import array_size, timed
+from .thermo import CP, CV, K, P1, T1
+
+T_MAX = 2500  # K, peak temperature limit of the dual cycle
+
+
+def default_cutoff_ratio(rc):
+    # Constant-pressure expansion ratio (v4/v3) of the dual cycle used in the scripts
+    return 1 + 0.05 * (np.asarray(rc, dtype=float) - 1)
+
+
+def _compression(rc, P1, T1, k, cp, cv):
+    # States 1 and 2, shared by every cycle
+    R_air = cp - cv
+    v1 = R_air * T1 / P1
+    v2 = v1 / rc
+    P2 = P1 * rc**k
+    T2 = T1 * rc**(k - 1)
+    return v1, v2, P2, T2
+
+
+def _result(P, v, T, qin, qout):
+    # Stack the per-state arrays along a trailing state axis and add cycle totals
+    P, v, T = (np.stack(np.broadcast_arrays(*x), axis=-1) for x in (P, v, T))
+    w_net = qin - qout
+    return {
+        'P': P,
+        'v': v,
+        'T': T,
+        'qin': qin,
+        'qout': qout,
+        'w_net': w_net,
+        'eta': w_net / qin,
+        'mep': w_net / (v[..., 0] - v[..., 1]),
+    }
+
+
+@timed('state_calc', samples=array_size('eta'))
+def otto_cycle(rc, qin, P1=P1, T1=T1, k=K, cp=CP, cv=CV):
+    """Otto cycle states 1-4 for broadcastable rc and qin (kJ/kg).
+
+    Returns P (kPa), v (m^3/kg) and T (K) with a trailing state axis, plus qin, qout,
+    w_net (kJ/kg), eta and mep (kPa).
+    """
+    rc, qin, P1, T1, k = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (rc, qin, P1, T1, k)))
+    v1, v2, P2, T2 = _compression(rc, P1, T1, k, cp, cv)
+
+    v3 = v2
+    T3 = T2 + qin / cv
+    P3 = P2 * (T3 / T2)
+
+    v4 = v1
+    P4 = P3 * (1 / rc)**k
+    T4 = T3 * (1 / rc)**(k - 1)
+
+    qout = cv * (T4 - T1)
+    return _result((P1, P2, P3, P4), (v1, v2, v3, v4), (T1, T2, T3, T4), qin, qout)
+
+
+@timed('state_calc', samples=array_size('eta'))
+def diesel_cycle(rc, qin, P1=P1, T1=T1, k=K, cp=CP, cv=CV):
+    """Diesel cycle states 1-4 for broadcastable rc and qin (kJ/kg).
+
+    The result also holds the cutoff ratio ``alpha`` = v3/v2 implied by qin.
+    """
+    rc, qin, P1, T1, k = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (rc, qin, P1, T1, k)))
+    v1, v2, P2, T2 = _compression(rc, P1, T1, k, cp, cv)
+
+    P3 = P2
+    T3 = T2 + qin / cp
+    alpha = T3 / T2
+    v3 = v2 * alpha
+
+    v4 = v1
+    exp_ratio = v1 / v3
+    P4 = P3 * (1 / exp_ratio)**k
+    T4 = T3 * (1 / exp_ratio)**(k - 1)
+
+    qout = cv * (T4 - T1)
+    result = _result((P1, P2, P3, P4), (v1, v2, v3, v4), (T1, T2, T3, T4), qin, qout)
+    result['alpha'] = alpha
+    return result
+
+
+@timed('state_calc', samples=array_size('eta'))
+def dual_cycle(rc, rp, alpha=None, P1=P1, T1=T1, k=K, cp=CP, cv=CV, T_max=T_MAX):
+    """Dual cycle states 1-5 for broadcastable rc, rp (P3/P2) and cutoff ratio alpha (v4/v3).
+
+    alpha defaults to the scripts' 1 + 0.05*(rc - 1). Where the constant-pressure heat
+    addition would take T4 above ``T_max`` it ends at T_max instead; ``T_max_limited`` marks
+    those elements and ``alpha`` holds the cutoff ratio actually used. ``valid`` is False
+    where T3 alone already exceeds T_max. qin is the heat added in 2-3 and 3-4.
+    """
+    if alpha is None:
+        alpha = default_cutoff_ratio(rc)
+    rc, rp, alpha, P1, T1, k, T_max = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (rc, rp, alpha, P1, T1, k, T_max)))
+    v1, v2, P2, T2 = _compression(rc, P1, T1, k, cp, cv)
+
+    v3 = v2
+    P3 = rp * P2
+    T3 = rp * T2
+
+    P4 = P3
+    T4_calc = T3 * alpha
+    limited = T4_calc > T_max
+    T4 = np.where(limited, T_max, T4_calc)
+    v4 = v3 * (T4 / T3)
+
+    v5 = v1
+    exp_ratio = v1 / v4
+    P5 = P4 * (1 / exp_ratio)**k
+    T5 = T4 * (1 / exp_ratio)**(k - 1)
+
+    qin = cv * (T3 - T2) + cp * (T4 - T3)
+    qout = cv * (T5 - T1)
+    result = _result((P1, P2, P3, P4, P5), (v1, v2, v3, v4, v5), (T1, T2, T3, T4, T5), qin, qout)
+    result['alpha'] = T4 / T3
+    result['T_max_limited'] = limited
+    result['valid'] = T3 <= T_max
+    return result
+
+
+def dual_heat_input(rc, rp, alpha=None, T1=T1, k=K, cp=CP, cv=CV, T_max=T_MAX):
+    """Heat input (kJ/kg) of the dual cycle under the peak-temperature limit, in closed form.
+
+    This is the common heat input at which the Otto and Diesel cycles are compared with
+    the dual cycle. rp is reduced to T_max/T2 if constant-volume heat addition alone
+    would pass T_max, and the cutoff ratio alpha (default 1 + 0.05*(rc - 1)) to T_max/T3.
+    Pass ``alpha=np.inf`` to use the whole temperature budget, i.e. the largest heat input
+    the limit allows. Returns a dict with qin and the rp and alpha actually used.
+    """
+    if alpha is None:
+        alpha = default_cutoff_ratio(rc)
+    rc, rp, alpha, T1, k, T_max = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (rc, rp, alpha, T1, k, T_max)))
+
+    T2 = T1 * rc**(k - 1)
+    rp = np.minimum(rp, T_max / T2)
+    T3 = rp * T2
+    alpha = np.minimum(alpha, T_max / T3)
+    T4 = alpha * T3
+
+    qin = cv * (T3 - T2) + cp * (T4 - T3)
+    return {'qin': qin, 'rp': rp, 'alpha': alpha}
+
+
+@lru_cache(maxsize=4096)
+def _dual_heat_input_scalar(rc, rp, alpha, T1, k, cp, cv, T_max):
+    result = dual_heat_input(rc, rp, alpha, T1=T1, k=k, cp=cp, cv=cv, T_max=T_max)
+    return tuple(float(result[key]) for key in ('qin', 'rp', 'alpha'))
+
+
+def dual_heat_input_cached(rc, rp, alpha=None, T1=T1, k=K, cp=CP, cv=CV, T_max=T_MAX):
+    # Memoized scalar version of dual_heat_input for repeated operating points
+    if alpha is None:
+        alpha = float(default_cutoff_ratio(rc))
+    qin, rp, alpha = _dual_heat_input_scalar(float(rc), float(rp), float(alpha), float(T1),
+                                             float(k), float(cp), float(cv), float(T_max))
+    return {'qin': qin, 'rp': rp, 'alpha': alpha}
+
+
+def compare_cycles(rc, rp, alpha=None, P1=P1, T1=T1, k=K, cp=CP, cv=CV, T_max=T_MAX):
+    """Dual, Otto and Diesel cycles at the dual cycle's heat input, for whole arrays at once.
+
+    The heat input and the rp/alpha actually used come from ``dual_heat_input``; the result
+    maps 'dual', 'otto' and 'diesel' to the per-cycle dicts and also holds 'qin'.
+    """
+    heat = dual_heat_input(rc, rp, alpha, T1=T1, k=k, cp=cp, cv=cv, T_max=T_max)
+    return {
+        'qin': heat['qin'],
+        'dual': dual_cycle(rc, heat['rp'], heat['alpha'], P1=P1, T1=T1, k=k, cp=cp, cv=cv, T_max=T_max),
+        'otto': otto_cycle(rc, heat['qin'], P1=P1, T1=T1, k=k, cp=cp, cv=cv),
+        'diesel': diesel_cycle(rc, heat['qin'], P1=P1, T1=T1, k=k, cp=cp, cv=cv),
+    }
+
+
+@timed('state_calc', samples=array_size('eta'))
+def atkinson_cycle(rc, re, P1=P1, T1=T1, k=K, R_air=CP - CV):
+    """Atkinson cycle states 1-4 for broadcastable compression ratio rc and expansion ratio re.
+
+    Heat is added at constant volume (2-3) and rejected at constant pressure (4-1), with
+    cv = R/(k-1) and cp = k*cv. ``valid`` is False where re <= rc, for which the cycle
+    degenerates (no expansion beyond state 1 and no positive heat addition). MEP uses the
+    full swept volume v4 - v2.
+    """
+    rc, re, P1, T1, k = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (rc, re, P1, T1, k)))
+    cv = R_air / (k - 1)
+    cp = k * cv
+
+    v1 = R_air * T1 / P1
+    v2 = v1 / rc
+    P2 = P1 * rc**k
+    T2 = T1 * rc**(k - 1)
+
+    P4 = P1
+    v4 = re * v2
+    T4 = T1 * (v4 / v1)
+
+    v3 = v2
+    T3 = T4 * re**(k - 1)
+    P3 = P4 * re**k
+
+    qin = cv * (T3 - T2)
+    qout = cp * (T4 - T1)
+    valid = re > rc
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = _result((P1, P2, P3, P4), (v1, v2, v3, v4), (T1, T2, T3, T4), qin, qout)
+        result['eta'] = np.where(valid, result['eta'], np.nan)
+        result['mep'] = np.where(valid, result['w_net'] / (v4 - v2), np.nan)
+    result['valid'] = valid
+    return result
@@ -0,0 +1,26 @@
+import numpy as np
+
+# Default single-cylinder geometry (m), compression ratio of the cycle scripts
+BORE = 0.100
+STROKE = 0.120
+CONROD = 0.200
+RC = 14
+
+
+def displacement_volume(bore=BORE, stroke=STROKE):
+    return np.pi / 4 * np.asarray(bore, dtype=float)**2 * stroke
+
+
+def cylinder_volume(theta, bore=BORE, stroke=STROKE, conrod=CONROD, rc=RC):
+    """Slider-crank cylinder volume (m^3) at crank angle ``theta`` (deg, 0 = TDC).
+
+    All arguments broadcast against each other.
+    """
+    theta = np.radians(np.asarray(theta, dtype=float))
+    crank = np.asarray(stroke, dtype=float) / 2
+    V_d = displacement_volume(bore, stroke)
+    V_c = V_d / (np.asarray(rc, dtype=float) - 1)
+
+    # Piston distance from the crank axis
+    s = crank * np.cos(theta) + np.sqrt(conrod**2 - (crank * np.sin(theta))**2)
+    return V_c + np.pi / 4 * np.asarray(bore, dtype=float)**2 * (conrod + crank - s)
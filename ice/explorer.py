@@ -0,0 +1,210 @@
+# Interactive explorers for the three-cycle comparison, Atkinson and valve-lift diagrams.
+#
+# Each view is a pyplot figure with sliders under the diagram. The diagram is drawn by the
+# renderers of ice.render, so a slider move only recomputes the model and moves the
+# existing artists. Those artists, and the moving parts of the sliders, are animated and
+# blitted onto a cached background. The whole figure is redrawn, and the background
+# captured again, only when the data leaves the current axis limits or shrinks well inside
+# them. matplotlib is imported inside the constructors, as in ice.plotting.
+
+from abc import ABC, abstractmethod
+
+from .cam_timing import EVC, EVO, IVC, IVO, L_MAX
+from .cycles import atkinson_cycle, compare_cycles
+from .render import CYCLE_TITLES, PVRenderer, ValveLiftRenderer
+
+# Slider name -> (label, min, max, initial value); the valve events start at the lift
+# script's timing and use its convention (EVO = 540 - 45, EVC = 0 + 10), which the lift
+# renderer marks
+COMPARISON_SLIDERS = {
+    'rc': ('rc', 6.0, 22.0, 14.0),
+    'rp': ('rp', 1.0, 3.0, 1.7),
+}
+ATKINSON_SLIDERS = {
+    'rc': ('rc', 6.0, 20.0, 14.0),
+    're': ('re', 8.0, 30.0, 17.0),
+}
+VALVE_SLIDERS = {
+    'IVO': ('IVO (°)', 300.0, 360.0, IVO),
+    'IVC': ('IVC (°)', 180.0, 260.0, IVC),
+    'EVO': ('EVO (°)', 460.0, 530.0, EVO),
+    'EVC': ('EVC (°)', 0.0, 45.0, EVC),
+    'l_max': ('l_max (mm)', 5.0, 15.0, L_MAX),
+}
+
+# Curve resolution of the explorer views: isentropic tolerance and lift step (deg)
+EXPLORER_TOL = 1e-5
+EXPLORER_RESOLUTION = 0.05
+
+# Rescale when the data reaches past the axes or fills less than this share of them
+_SHRINK = 0.5
+
+
+class _Explorer(ABC):
+    """Figure with one slider per value and blitted updates of the view's artists.
+
+    Subclasses set ``renderer`` (an ice.render renderer drawing on ``ax``) and implement
+    ``update``.
+    """
+
+    renderer = None
+
+    def __init__(self, sliders, figsize, right=0.95, **values):
+        import matplotlib.pyplot as plt
+        from matplotlib.widgets import Slider
+
+        unknown = set(values) - set(sliders)
+        if unknown:
+            raise ValueError(f"unknown value(s) {', '.join(sorted(unknown))}; "
+                             f"expected some of {', '.join(sliders)}")
+
+        self.fig = plt.figure(figsize=figsize)
+        height = 0.035
+        bottom = 0.06 + height * len(sliders)
+        self.ax = self.fig.add_axes([0.08, bottom + 0.06, right - 0.08, 0.88 - bottom - 0.06])
+
+        self.sliders = {}
+        for row, (name, (label, lo, hi, init)) in enumerate(sliders.items()):
+            slider_ax = self.fig.add_axes([0.15, 0.04 + height * (len(sliders) - 1 - row), 0.6, 0.025])
+            # A plain format keeps the value text out of the (slow) mathtext parser
+            slider = Slider(slider_ax, label, lo, hi, valinit=values.get(name, init), valfmt='%.2f')
+            # The blit below redraws the slider, so it must not ask for a full redraw itself
+            slider.drawon = False
+            slider.on_changed(self._on_change)
+            self.sliders[name] = slider
+
+        self.background = None
+        self.fig.canvas.mpl_connect('draw_event', self._on_draw)
+
+    @property
+    def values(self):
+        return {name: slider.val for name, slider in self.sliders.items()}
+
+    @property
+    def artists(self):
+        return self.renderer.artists
+
+    @abstractmethod
+    def update(self, values):
+        # Recompute and move the artists; return True if the axis limits must change
+        ...
+
+    def rescale(self):
+        self.renderer.rescale()
+
+    def _on_draw(self, event):
+        self.background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_animated()
+
+    def _slider_artists(self):
+        # The parts of each slider that move; its label and frame stay in the background
+        for slider in self.sliders.values():
+            yield slider.poly
+            yield slider.valtext
+            handle = getattr(slider, '_handle', None)
+            if handle is not None:
+                yield handle
+
+    def _draw_animated(self):
+        for artist in (*self.artists, *self._slider_artists()):
+            artist.set_animated(True)
+            self.fig.draw_artist(artist)
+
+    def _on_change(self, _):
+        canvas = self.fig.canvas
+        if self.update(self.values) or self.background is None:
+            self.rescale()
+            canvas.draw_idle()
+            return
+        canvas.restore_region(self.background)
+        self._draw_animated()
+        canvas.blit(self.fig.bbox)
+        canvas.flush_events()
+
+    def _start(self):
+        self.update(self.values)
+        self.rescale()
+        for artist in (*self.artists, *self._slider_artists()):
+            artist.set_animated(True)
+
+
+def _outgrown(ax, x_max, y_max):
+    # True if (x_max, y_max) is past the current limits or far inside them
+    x_top, y_top = ax.get_xlim()[1], ax.get_ylim()[1]
+    return not (_SHRINK * x_top <= x_max <= x_top and _SHRINK * y_top <= y_max <= y_top)
+
+
+class ComparisonExplorer(_Explorer):
+    """Dual, Otto and Diesel cycles at a common heat input, with rc and rp sliders."""
+
+    def __init__(self, tol=EXPLORER_TOL, **values):
+        super().__init__(COMPARISON_SLIDERS, (12, 8.5), right=0.74, **values)
+        self.renderer = PVRenderer('comparison', ax=self.ax, tol=tol)
+        self._start()
+
+    def update(self, values):
+        results = compare_cycles(values['rc'], values['rp'])
+        self.renderer.update(results, f"P-v Diagram for Dual, Otto, and Diesel Cycles (rc={values['rc']:.3g})",
+                             autoscale=False)
+        return _outgrown(self.ax, max(float(results[c]['v'].max()) for c in ('dual', 'otto', 'diesel')),
+                         max(float(results[c]['P'].max()) for c in ('dual', 'otto', 'diesel')))
+
+
+class AtkinsonExplorer(_Explorer):
+    """Atkinson cycle with compression and expansion ratio sliders."""
+
+    def __init__(self, tol=EXPLORER_TOL, **values):
+        super().__init__(ATKINSON_SLIDERS, (10, 8), **values)
+        self.renderer = PVRenderer('atkinson', ax=self.ax, tol=tol)
+        self._start()
+
+    def update(self, values):
+        result = atkinson_cycle(values['rc'], values['re'])
+        title = CYCLE_TITLES['atkinson'].format(rc=round(values['rc'], 2), re=round(values['re'], 2))
+        self.renderer.update({'atkinson': result}, title, autoscale=False)
+        return _outgrown(self.ax, float(result['v'].max()), float(result['P'].max()))
+
+
+class ValveLiftExplorer(_Explorer):
+    """Valve-lift diagram with sliders for the four valve events and the maximum lift.
+
+    Moving one valve's event recomputes only that valve's lift.
+    """
+
+    def __init__(self, resolution=EXPLORER_RESOLUTION, **values):
+        super().__init__(VALVE_SLIDERS, (14, 8.5), **values)
+        self.renderer = ValveLiftRenderer(resolution, ax=self.ax)
+        self._l_max = None
+        self._start()
+
+    def update(self, values):
+        self.renderer.update(**values, rescale=False)
+        changed = values['l_max'] != self._l_max
+        self._l_max = values['l_max']
+        return changed
+
+    def rescale(self):
+        self.ax.set_ylim(0, self._l_max * 1.1)
+
+
+EXPLORERS = {
+    'comparison': ComparisonExplorer,
+    'atkinson': AtkinsonExplorer,
+    'valve_lift': ValveLiftExplorer,
+}
+
+
+def explore(view, show=True, **values):
+    """Open the interactive explorer for ``view`` ('comparison', 'atkinson' or 'valve_lift').
+
+    Keyword arguments set the initial slider values, e.g. ``explore('atkinson', re=20)``.
+    Returns the explorer; with ``show=True`` this blocks in plt.show() until it is closed.
+    """
+    import matplotlib.pyplot as plt
+
+    if view not in EXPLORERS:
+        raise ValueError(f"unknown view {view!r}, expected one of {', '.join(EXPLORERS)}")
+    explorer = EXPLORERS[view](**values)
+    if show:
+        plt.show()
+    return explorer
@@ -0,0 +1,279 @@
+# Stage timing, sample counters and optional profiling for the ICE models.
+#
+# The stages of the models (state calculation, isentropic curves, lift, flow, figure
+# building, rendering) are wrapped in named spans with the ``timed`` decorator or the
+# ``span`` context manager. While recording is off, a span is a shared no-op and a
+# decorated function costs one attribute check per call. While it is on, spans nest: each
+# is recorded under its path (e.g. 'render/figure_build'), with call count, total, self
+# and min/max time. Recording is per process; it starts when ICE_INSTRUMENT=1 is set or
+# inside ``instrument()``, which can also capture cProfile and tracemalloc data for the
+# report. Process pools pass ``pool_initializer()`` to their workers, which then record
+# too and hand back their spans and counters with each task (``drain``); the parent
+# ``merge``s them into a separate table of worker time, summed over the workers. Every
+# model module imports this one, so the profiling and reporting modules (cProfile,
+# pstats, tracemalloc, json) are only imported when they are used.
+
+import contextlib
+import os
+import time
+from functools import wraps
+
+import numpy as np
+
+
+class _Recorder:
+    def __init__(self):
+        self.enabled = False
+        self.reset()
+
+    def reset(self):
+        self.spans = {}  # path -> [calls, total, child, min, max]
+        self.worker_spans = {}  # the same, merged from pool workers
+        self.counters = {}
+        self.stack = []
+        self.started = time.perf_counter()
+        self.profile = None
+        self.memory = None
+        self.elapsed = None
+
+
+_recorder = _Recorder()
+_NULL_SPAN = contextlib.nullcontext()
+
+
+class _Span:
+    __slots__ = ('name', 'path', 'start', 'child')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        stack = _recorder.stack
+        self.path = f'{stack[-1].path}/{self.name}' if stack else self.name
+        self.child = 0.0
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        stack = _recorder.stack
+        stack.pop()
+        if stack:
+            stack[-1].child += elapsed
+        _add_stats(_recorder.spans, self.path, [1, elapsed, self.child, elapsed, elapsed])
+        return False
+
+
+def _add_stats(table, path, new):
+    stats = table.get(path)
+    if stats is None:
+        table[path] = list(new)
+    else:
+        stats[0] += new[0]
+        stats[1] += new[1]
+        stats[2] += new[2]
+        stats[3] = min(stats[3], new[3])
+        stats[4] = max(stats[4], new[4])
+
+
+def enable(reset=True):
+    if reset:
+        _recorder.reset()
+    _recorder.enabled = True
+
+
+def disable():
+    _recorder.enabled = False
+
+
+def is_enabled():
+    return _recorder.enabled
+
+
+def pool_initializer():
+    # ``initializer`` for a process pool: workers record while this process does
+    return enable if _recorder.enabled else None
+
+
+def drain():
+    """Spans and counters recorded since the last drain, cleared afterwards; None when
+    recording is off. Pool workers return this with each task's result."""
+    if not _recorder.enabled:
+        return None
+    data = {'spans': _recorder.spans, 'counters': _recorder.counters}
+    _recorder.spans, _recorder.counters = {}, {}
+    return data
+
+
+def merge(data):
+    # Add a worker's ``drain()`` to this process's report: spans to the worker table,
+    # counters to the common ones
+    if not data or not _recorder.enabled:
+        return
+    for path, stats in data['spans'].items():
+        _add_stats(_recorder.worker_spans, path, stats)
+    for name, value in data['counters'].items():
+        count(name, value)
+
+
+def span(name):
+    """Context manager timing the enclosed block as stage ``name`` (no-op when disabled)."""
+    return _Span(name) if _recorder.enabled else _NULL_SPAN
+
+
+def count(name, n=1):
+    # Add n to counter ``name`` while recording
+    if _recorder.enabled:
+        _recorder.counters[name] = _recorder.counters.get(name, 0) + int(n)
+
+
+def timed(name, samples=None):
+    """Decorator recording every call of the function as stage ``name``.
+
+    ``samples``, if given, maps the function's result to the number of samples it
+    produced, which is added to the 'samples.<name>' counter.
+    """
+    def decorate(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _recorder.enabled:
+                return function(*args, **kwargs)
+            with _Span(name):
+                result = function(*args, **kwargs)
+            if samples is not None:
+                count(f'samples.{name}', samples(result))
+            return result
+        return wrapper
+    return decorate
+
+
+def array_size(key=None):
+    # ``samples`` helper: size of the result, or of result[key] for dict results
+    if key is None:
+        return np.size
+    return lambda result: np.size(result[key])
+
+
+@contextlib.contextmanager
+def instrument(cprofile=False, memory=False, top=20):
+    """Record spans and counters for the enclosed block, starting from a clean slate.
+
+    With ``cprofile`` the block also runs under cProfile and the ``top`` functions by
+    cumulative time go into the report; with ``memory`` tracemalloc records the peak
+    and the ``top`` allocation sites, unless the block stopped tracemalloc itself. Yields
+    nothing; call ``report()`` afterwards.
+    """
+    import cProfile
+    import tracemalloc
+
+    was_enabled = _recorder.enabled
+    enable()
+    profiler = cProfile.Profile() if cprofile else None
+    tracing = memory and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+    if profiler:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+            _recorder.profile = _profile_rows(profiler, top)
+        # The block may have stopped tracemalloc itself (the benchmarks do)
+        if memory and tracemalloc.is_tracing():
+            _, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+            _recorder.memory = {
+                'peak_bytes': peak,
+                'top': [{'where': str(stat.traceback), 'bytes': stat.size, 'blocks': stat.count}
+                        for stat in snapshot.statistics('lineno')[:top]],
+            }
+            if tracing:
+                tracemalloc.stop()
+        _recorder.elapsed = time.perf_counter() - _recorder.started
+        _recorder.enabled = was_enabled
+
+
+def _profile_rows(profiler, top):
+    import pstats
+
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, line, function), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({'function': f'{os.path.basename(filename)}:{line}({function})', 'calls': calls,
+                     'tottime': tottime, 'cumtime': cumtime})
+    rows.sort(key=lambda row: row['cumtime'], reverse=True)
+    return rows[:top]
+
+
+def report():
+    """Spans, counters and (if captured) profile and memory data as a JSON-ready dict.
+
+    Stages run in pool workers are listed under 'worker_spans'. Their times are summed
+    over all workers, so they can add up to more than the wall time; their share is of
+    the workers' total time in top-level stages.
+    """
+    wall = _recorder.elapsed or time.perf_counter() - _recorder.started
+    result = {'wall': wall, 'spans': _span_rows(_recorder.spans, wall),
+              'counters': dict(_recorder.counters)}
+    if _recorder.worker_spans:
+        busy = sum(stats[1] for path, stats in _recorder.worker_spans.items() if '/' not in path)
+        result['worker_time'] = busy
+        result['worker_spans'] = _span_rows(_recorder.worker_spans, busy)
+    if _recorder.profile is not None:
+        result['profile'] = _recorder.profile
+    if _recorder.memory is not None:
+        result['memory'] = _recorder.memory
+    return result
+
+
+def _span_rows(table, reference):
+    rows = [{'stage': path, 'calls': calls, 'total': total, 'self': total - child,
+             'mean': total / calls, 'min': lo, 'max': hi,
+             'share': total / reference if reference else 0.0}
+            for path, (calls, total, child, lo, hi) in table.items()]
+    rows.sort(key=lambda row: row['stage'])
+    return rows
+
+
+def _format_rows(rows):
+    return [f"{row['stage']:<40} {row['calls']:>8d} {row['total'] * 1e3:>10.2f} "
+            f"{row['self'] * 1e3:>10.2f} {row['mean'] * 1e3:>10.3f} {row['share']:>7.1%}"
+            for row in rows]
+
+
+def format_report(data=None):
+    """Text table of a ``report()`` dict."""
+    data = data or report()
+    lines = [f"{'stage':<40} {'calls':>8} {'total ms':>10} {'self ms':>10} {'mean ms':>10} {'share':>7}"]
+    lines += _format_rows(data['spans'])
+    lines.append(f"{'wall':<40} {'':>8} {data['wall'] * 1e3:>10.2f}")
+    for name, value in sorted(data['counters'].items()):
+        lines.append(f'{name:<40} {value:>8,d}')
+    if 'worker_spans' in data:
+        lines.append('')
+        lines.append('worker stages (time summed over all workers, not wall time)')
+        lines += _format_rows(data['worker_spans'])
+        lines.append(f"{'worker time':<40} {'':>8} {data['worker_time'] * 1e3:>10.2f}")
+    if 'memory' in data:
+        lines.append(f"{'peak traced memory':<40} {data['memory']['peak_bytes'] / 2**20:>8.2f} MiB")
+    if 'profile' in data:
+        lines.append('')
+        lines.append(f"{'function':<60} {'calls':>8} {'tottime':>9} {'cumtime':>9}")
+        for row in data['profile']:
+            lines.append(f"{row['function'][-60:]:<60} {row['calls']:>8d} {row['tottime']:>9.4f} "
+                         f"{row['cumtime']:>9.4f}")
+    return '\n'.join(lines)
+
+
+def save_report(path, data=None):
+    import json
+
+    with open(path, 'w') as f:
+        json.dump(data or report(), f, indent=1)
+
+
+if os.environ.get('ICE_INSTRUMENT', '') not in ('', '0'):
+    enable()
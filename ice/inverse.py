@@ -0,0 +1,84 @@
+# Inverse dual-cycle problem: the rc, rp and alpha that reach a target peak pressure, peak
+# temperature and heat input.
+#
+# With P3 = P_max and T4 = T_max, rp and alpha follow from rc, and T3 = (P_max/P1)*T1/rc.
+# The heat input
+#     qin(rc) = cv*(T3 - T2) + cp*(T_max - T3),  T2 = T1*rc^(k-1)
+# leaves one equation in rc. The feasible range runs from alpha = 1 (T3 = T_max, the Otto
+# limit) to rp = 1 (P2 = P_max, the Diesel limit), and qin(rc) rises across it. So every
+# target is a bracketed scalar root, solved with Newton steps that fall back to bisection
+# when they leave the bracket, for the whole array of targets at once.
+
+import numpy as np
+
+from .thermo import CP, CV, K, P1, T1
+
+
+def _heat_residual(rc, P_ratio, T_max, qin, T1, k, cp, cv):
+    # qin(rc) - qin and its derivative in rc
+    T2 = T1 * rc**(k - 1)
+    T3 = P_ratio * T1 / rc
+    f = cv * (T3 - T2) + cp * (T_max - T3) - qin
+    df = (cp - cv) * P_ratio * T1 / rc**2 - cv * (k - 1) * T2 / rc
+    return f, df
+
+
+def solve_dual_cycle(P_max, T_max, qin, P1=P1, T1=T1, k=K, cp=CP, cv=CV, tol=1e-12, max_iter=60):
+    """rc, rp and alpha of the dual cycle with peak pressure P_max (kPa), peak temperature
+    T_max (K) and heat input qin (kJ/kg), for broadcastable arrays of targets.
+
+    Returns a dict with rc, rp and alpha (NaN where no solution exists), ``feasible``
+    (the targets are reachable with rc > 1, rp >= 1 and alpha >= 1), ``converged`` (the
+    relative rc bracket shrank below ``tol``), ``iterations`` and ``residual``, the heat
+    input error (kJ/kg) at the returned rc. Feeding rc, rp and alpha back into
+    ``dual_cycle`` with ``T_max`` reproduces the targets.
+    """
+    P_max, T_max, qin, P1, T1, k, cp, cv = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (P_max, T_max, qin, P1, T1, k, cp, cv)))
+    P_ratio = P_max / P1
+
+    # Bracket: alpha = 1 at the low end, rp = 1 at the high end
+    lo = np.maximum(P_ratio * T1 / T_max, 1.0)
+    hi = P_ratio**(1 / k)
+    f_lo, _ = _heat_residual(lo, P_ratio, T_max, qin, T1, k, cp, cv)
+    f_hi, _ = _heat_residual(hi, P_ratio, T_max, qin, T1, k, cp, cv)
+    scale = np.maximum(np.abs(qin), 1.0)
+    feasible = (lo < hi) & (f_lo <= 1e-12 * scale) & (f_hi >= -1e-12 * scale)
+
+    rc = np.where(feasible, 0.5 * (lo + hi), np.nan)
+    active = feasible.copy()
+    converged = np.zeros(rc.shape, dtype=bool)
+    iterations = np.zeros(rc.shape, dtype=int)
+    for _ in range(max_iter):
+        if not active.any():
+            break
+        f, df = _heat_residual(rc, P_ratio, T_max, qin, T1, k, cp, cv)
+        # Shrink the bracket around the root, then try Newton inside it
+        below = f < 0
+        lo = np.where(active & below, rc, lo)
+        hi = np.where(active & ~below, rc, hi)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            newton = rc - f / df
+        # Inclusive, so an exact root (which has just become a bracket end) is kept
+        inside = (newton >= lo) & (newton <= hi)
+        step = np.where(inside, newton, 0.5 * (lo + hi))
+
+        done = active & ((np.abs(step - rc) <= tol * rc) | (hi - lo <= tol * rc) | (f == 0))
+        rc = np.where(active, step, rc)
+        iterations += active
+        converged |= done
+        active &= ~done
+
+    T2 = T1 * rc**(k - 1)
+    rp = P_ratio / rc**k
+    alpha = T_max / (rp * T2)
+    residual, _ = _heat_residual(rc, P_ratio, T_max, qin, T1, k, cp, cv)
+    return {
+        'rc': rc,
+        'rp': rp,
+        'alpha': alpha,
+        'feasible': feasible,
+        'converged': converged,
+        'iterations': iterations,
+        'residual': residual,
+    }
@@ -0,0 +1,279 @@
+# Isentropic relations of a perfect gas, their inverses in Mach number, and operating maps
+# of converging-diverging nozzles and valve curtains.
+#
+# The ratios to stagnation conditions are closed-form in Mach number for any gamma, and so
+# is their inversion from a pressure, temperature or density ratio. The area ratio A/A*
+# has no closed-form inverse: for each gamma a table of y = sign(M - 1)*sqrt(ln(A/A*))
+# against ln M is computed once. y is smooth and increasing through M = 1, where A/A* has
+# its double root, so interpolating it gives a starting Mach number on either branch that
+# a few vectorized Newton steps polish to machine precision. Nothing solves per point.
+
+from functools import lru_cache
+
+import numpy as np
+
+from .breathing import CD_VALVE, D_INTAKE, valve_flow_area
+from .instrument import array_size, timed
+from .throat_flow import R_AIR, critical_pressure_ratio
+
+# Mach range and size of the per-gamma area-ratio table (log-spaced)
+TABLE_MACH = (1e-8, 1e4)
+TABLE_SIZE = 4097
+
+# Flow regimes of nozzle_map
+NOZZLE_REGIMES = ('no_flow', 'subsonic', 'shock_in_nozzle', 'overexpanded', 'design', 'underexpanded')
+
+
+def isentropic_ratios(M, gamma=1.4):
+    """T/Tt, P/Pt, rho/rhot and A/A* at Mach number M, for broadcastable M and gamma."""
+    M, gamma = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (M, gamma)))
+    t = 1 + 0.5 * (gamma - 1) * M**2
+    T = 1 / t
+    with np.errstate(divide='ignore'):
+        A = (2 * t / (gamma + 1))**((gamma + 1) / (2 * (gamma - 1))) / M
+    return {'T': T, 'P': T**(gamma / (gamma - 1)), 'rho': T**(1 / (gamma - 1)), 'A': A}
+
+
+def _mach_from_log_ratio(log_T, valid, gamma):
+    # Mach number from ln(T/Tt); expm1 keeps the accuracy at small Mach numbers
+    with np.errstate(invalid='ignore', over='ignore'):
+        M2 = 2 / (gamma - 1) * np.expm1(-log_T)
+    return np.where(valid, np.sqrt(np.abs(M2)), np.nan)
+
+
+def _inverse_args(ratio, gamma):
+    ratio, gamma = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (ratio, gamma)))
+    valid = (ratio > 0) & (ratio <= 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.log(ratio), valid, gamma
+
+
+def mach_from_temperature_ratio(T_ratio, gamma=1.4):
+    """Mach number at T/Tt = ``T_ratio`` (in (0, 1]); NaN outside that range."""
+    log_ratio, valid, gamma = _inverse_args(T_ratio, gamma)
+    return _mach_from_log_ratio(log_ratio, valid, gamma)
+
+
+def mach_from_pressure_ratio(P_ratio, gamma=1.4):
+    """Mach number at P/Pt = ``P_ratio`` (in (0, 1]); NaN outside that range."""
+    log_ratio, valid, gamma = _inverse_args(P_ratio, gamma)
+    return _mach_from_log_ratio(log_ratio * (gamma - 1) / gamma, valid, gamma)
+
+
+def mach_from_density_ratio(rho_ratio, gamma=1.4):
+    """Mach number at rho/rhot = ``rho_ratio`` (in (0, 1]); NaN outside that range."""
+    log_ratio, valid, gamma = _inverse_args(rho_ratio, gamma)
+    return _mach_from_log_ratio(log_ratio * (gamma - 1), valid, gamma)
+
+
+def _area_y(x, gamma):
+    # y = sign(M - 1)*sqrt(ln(A/A*)) and dy/dx at x = ln M. Writing ln(A/A*) in x and
+    # q = M^2 - 1 keeps its relative accuracy both near M = 1 and at small M.
+    q = np.expm1(2 * x)
+    b = (gamma - 1) / (gamma + 1)
+    log_A = 0.5 * (np.log1p(b * q) / b - 2 * x)
+    y = np.sign(x) * np.sqrt(np.maximum(log_A, 0.0))
+    t = 1 + 0.5 * (gamma - 1) * (q + 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dy = np.where(np.abs(q) > 1e-6, q / t / (2 * y), np.sqrt(2 / (gamma + 1)))
+    return y, dy
+
+
+@lru_cache(maxsize=64)
+def flow_table(gamma=1.4):
+    """Isentropic table for one gamma on TABLE_SIZE log-spaced Mach numbers in TABLE_MACH.
+
+    A dict with M, T, P, rho and A (as in ``isentropic_ratios``) and y, the area-ratio
+    variable used to invert A/A*. Built once per gamma and cached.
+    """
+    M = np.geomspace(*TABLE_MACH, TABLE_SIZE)
+    table = isentropic_ratios(M, gamma)
+    table['M'] = M
+    table['y'], _ = _area_y(np.log(M), float(gamma))
+    for values in table.values():
+        values.flags.writeable = False
+    return table
+
+
+def mach_from_area_ratio(area_ratio, gamma=1.4, supersonic=False, tol=1e-13, max_iter=20):
+    """Mach number at A/A* = ``area_ratio`` (>= 1) on the subsonic or supersonic branch.
+
+    ``supersonic`` broadcasts, so both branches can be requested at once. Starting values
+    come from the table of ``flow_table`` (one per distinct gamma), then Newton steps on
+    ln M run until the relative change is below ``tol`` (two steps, as a rule). Round
+    trips M -> A/A* -> M agree to ~1e-14, and to 1e-10 down to |M - 1| = 1e-5, below
+    which A/A* itself barely depends on M. NaN for area_ratio < 1.
+    """
+    area_ratio, gamma, supersonic = np.broadcast_arrays(
+        np.asarray(area_ratio, dtype=float), np.asarray(gamma, dtype=float), np.asarray(supersonic, dtype=bool))
+    valid = area_ratio >= 1
+    with np.errstate(invalid='ignore', divide='ignore'):
+        y_target = np.where(supersonic, 1.0, -1.0) * np.sqrt(np.log(np.where(valid, area_ratio, 1.0)))
+
+    x = np.empty(area_ratio.shape)
+    for g in np.unique(gamma):
+        table = flow_table(float(g))
+        where = gamma == g
+        x[where] = np.interp(y_target[where], table['y'], np.log(table['M']))
+
+    # Keep each point on its branch: ln M <= 0 subsonic, >= 0 supersonic
+    lo = np.where(supersonic, 0.0, -np.inf)
+    hi = np.where(supersonic, np.inf, 0.0)
+    for _ in range(max_iter):
+        y, dy = _area_y(x, gamma)
+        step = (y - y_target) / dy
+        x = np.clip(x - step, lo, hi)
+        if not np.any(np.abs(step) > tol):
+            break
+    return np.where(valid, np.exp(x), np.nan)
+
+
+def mass_flux(M, Pt, Tt, gamma=1.4, R=R_AIR):
+    """Isentropic mass flow per unit area (kg/(s*m^2)) at Mach M from stagnation Pt (Pa), Tt (K)."""
+    M, Pt, Tt, gamma = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (M, Pt, Tt, gamma)))
+    t = 1 + 0.5 * (gamma - 1) * M**2
+    return Pt * M * np.sqrt(gamma / (R * Tt)) * t**(-(gamma + 1) / (2 * (gamma - 1)))
+
+
+def normal_shock(M1, gamma=1.4):
+    """Downstream Mach number, static and stagnation pressure ratios across a normal shock."""
+    M1, gamma = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (M1, gamma)))
+    M1_2 = M1**2
+    M2 = np.sqrt((1 + 0.5 * (gamma - 1) * M1_2) / (gamma * M1_2 - 0.5 * (gamma - 1)))
+    P_ratio = 1 + 2 * gamma / (gamma + 1) * (M1_2 - 1)
+    Pt_ratio = (((gamma + 1) * M1_2 / (2 + (gamma - 1) * M1_2))**(gamma / (gamma - 1))
+                * P_ratio**(-1 / (gamma - 1)))
+    return {'M2': M2, 'P_ratio': P_ratio, 'Pt_ratio': Pt_ratio}
+
+
+def _shock_loss(m, gamma):
+    # w = cbrt(-ln(Pt2/Pt1)) across a normal shock at M1^2 = m, and dw/dm. The loss grows
+    # as (m - 1)^3 from a weak shock, so w is close to linear in m and Newton on it
+    # converges even for shocks near the throat.
+    g1 = gamma - 1
+    P_ratio = 1 + 2 * gamma / (gamma + 1) * (m - 1)
+    loss = (np.log(P_ratio) / g1
+            - gamma / g1 * (np.log((gamma + 1) * m) - np.log(2 + g1 * m)))
+    dloss = (2 * gamma / ((gamma + 1) * g1 * P_ratio)
+             - gamma / g1 * (1 / m - g1 / (2 + g1 * m)))
+    w = np.cbrt(np.maximum(loss, 0.0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        limit = np.cbrt(2 * gamma / (3 * (gamma + 1)**2))
+        dw = np.where(m - 1 > 1e-4, dloss / (3 * w**2), limit)
+    return w, dw
+
+
+def _shock_mach(Pt_ratio, M_max, gamma, tol=1e-14, max_iter=60):
+    # Upstream Mach number in [1, M_max] of the normal shock with stagnation pressure ratio
+    # Pt_ratio: Newton steps on w(M1^2), bisecting whenever a step leaves the bracket.
+    # Converged points drop out, so the few slow ones near M1 = 1 iterate alone.
+    w_target = np.cbrt(-np.log(Pt_ratio))
+    lo = np.ones(Pt_ratio.shape)
+    hi = M_max**2
+    m = np.clip(1 + w_target / np.cbrt(2 * gamma / (3 * (gamma + 1)**2)), lo, hi)
+    active = np.arange(m.size)
+    for _ in range(max_iter):
+        if not active.size:
+            break
+        m_a, lo_a, hi_a = m[active], lo[active], hi[active]
+        w, dw = _shock_loss(m_a, gamma[active])
+        below = w < w_target[active]
+        lo_a = np.where(below, m_a, lo_a)
+        hi_a = np.where(below, hi_a, m_a)
+        newton = m_a - (w - w_target[active]) / dw
+        step = np.where((newton >= lo_a) & (newton <= hi_a), newton, 0.5 * (lo_a + hi_a))
+        done = (np.abs(step - m_a) <= tol * m_a) | (hi_a - lo_a <= tol * m_a)
+        m[active], lo[active], hi[active] = step, lo_a, hi_a
+        active = active[~done]
+    return np.sqrt(m)
+
+
+@timed('flow', samples=array_size('mdot'))
+def nozzle_map(area_ratio, Pt, Tt, P_back, A_throat, gamma=1.4, R=R_AIR):
+    """Quasi-1-D operating map of a converging-diverging nozzle, for whole arrays at once.
+
+    area_ratio (exit over throat area), Pt (Pa), Tt (K), P_back (Pa), A_throat (m^2),
+    gamma and R broadcast. Returns a dict with ``regime`` (index into NOZZLE_REGIMES),
+    ``choked``, mass flow ``mdot`` (kg/s), exit Mach number, pressure (Pa), temperature
+    (K) and velocity (m/s), and ``shock_area_ratio``, the area (over the throat) where a
+    normal shock stands in the diverging section, NaN elsewhere. Over- and underexpanded
+    nozzles report the isentropic exit state; the flow adjusts to P_back outside.
+    """
+    area_ratio, Pt, Tt, P_back, A_throat, gamma, R = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (area_ratio, Pt, Tt, P_back, A_throat, gamma, R)))
+    g1 = gamma - 1
+
+    # Exit Mach numbers and pressures of the two isentropic solutions, and the back
+    # pressure that puts a normal shock exactly at the exit
+    M_sub = mach_from_area_ratio(area_ratio, gamma)
+    M_sup = mach_from_area_ratio(area_ratio, gamma, supersonic=True)
+    P_sub = Pt * isentropic_ratios(M_sub, gamma)['P']
+    P_sup = Pt * isentropic_ratios(M_sup, gamma)['P']
+    P_shock_exit = P_sup * normal_shock(M_sup, gamma)['P_ratio']
+
+    regime = np.select(
+        [P_back >= Pt, P_back >= P_sub, P_back >= P_shock_exit, P_back > P_sup, P_back == P_sup],
+        [0, 1, 2, 3, 4], 5)
+    choked = regime >= 2
+
+    # Unchoked: the exit expands isentropically to P_back
+    M_exit = np.where(regime == 1, mach_from_pressure_ratio(np.minimum(P_back / Pt, 1.0), gamma), M_sup)
+    Pt_exit = Pt.copy()
+
+    # Shock inside: P_e*A_e = Pt*A* carries through the shock (Pt2*A*2 = Pt*A*), which gives
+    # the subsonic exit Mach number in closed form, then Pt2 and the shock's Mach number
+    inside = regime == 2
+    K = P_back * area_ratio / Pt
+    with np.errstate(divide='ignore', invalid='ignore'):
+        c = (2 / (gamma + 1))**((gamma + 1) / g1) * 2 / g1 / K**2
+        M_e = np.sqrt(-1 / g1 + np.sqrt(1 / g1**2 + c))
+    M_exit = np.where(inside, M_e, M_exit)
+    Pt_exit = np.where(inside, P_back / isentropic_ratios(M_e, gamma)['P'], Pt_exit)
+    shock_area = np.full(area_ratio.shape, np.nan)
+    if inside.any():
+        M1 = _shock_mach((Pt_exit / Pt)[inside], M_sup[inside], gamma[inside])
+        shock_area[inside] = isentropic_ratios(M1, gamma[inside])['A']
+
+    ratios = isentropic_ratios(M_exit, gamma)
+    T_exit = Tt * ratios['T']
+    mdot = np.where(choked, mass_flux(1.0, Pt, Tt, gamma, R) * A_throat,
+                    mass_flux(M_exit, Pt, Tt, gamma, R) * A_throat * area_ratio)
+    flowing = regime > 0
+    return {
+        'regime': regime,
+        'choked': choked,
+        'mdot': np.where(flowing, mdot, 0.0),
+        'M_exit': np.where(flowing, M_exit, 0.0),
+        'P_exit': np.where(flowing, Pt_exit * ratios['P'], P_back),
+        'T_exit': np.where(flowing, T_exit, Tt),
+        'V_exit': np.where(flowing, M_exit * np.sqrt(gamma * R * T_exit), 0.0),
+        'shock_area_ratio': shock_area,
+    }
+
+
+@timed('flow', samples=array_size('mdot'))
+def valve_curtain_map(lift, P_ratio, Pt=100e3, Tt=300.0, d_valve=D_INTAKE, Cd=CD_VALVE,
+                      gamma=1.4, R=R_AIR):
+    """Flow through a valve curtain over a (lift, pressure ratio) map, for whole arrays at once.
+
+    lift (m), P_ratio (downstream over upstream stagnation pressure), Pt (Pa), Tt (K),
+    d_valve (m), Cd, gamma and R broadcast, e.g. lift[:, None] with P_ratio[None, :]. The
+    effective area is that of ``valve_flow_area``; the flow through it is isentropic to
+    the downstream pressure, or sonic below the critical ratio.
+
+    Returns a dict with the effective ``area`` (m^2), curtain Mach number ``M``, ``choked``,
+    ``mdot`` (kg/s) and ``flow_fraction``, mdot over the choked flow at the same lift.
+    """
+    lift, P_ratio, Pt, Tt, d_valve, Cd, gamma, R = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (lift, P_ratio, Pt, Tt, d_valve, Cd, gamma, R)))
+    area = valve_flow_area(lift, d_valve, Cd)
+    choked = P_ratio <= critical_pressure_ratio(gamma)
+    M = np.where(choked, 1.0, mach_from_pressure_ratio(np.clip(P_ratio, 0.0, 1.0), gamma))
+    flux = mass_flux(M, Pt, Tt, gamma, R)
+    return {
+        'area': area,
+        'M': M,
+        'choked': choked,
+        'mdot': area * flux,
+        'flow_fraction': flux / mass_flux(1.0, Pt, Tt, gamma, R),
+    }
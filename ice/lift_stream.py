@@ -0,0 +1,119 @@
+# Streaming valve lift over many consecutive cycles at fine crank-angle resolution.
+#
+# Nothing proportional to the whole sequence is ever allocated: samples are produced in
+# fixed-size chunks, and the angle within the cycle comes from the integer sample index
+# modulo the samples per cycle, so it stays exact after millions of cycles (even when the
+# output is float32). Statistics are folded into a LiftStats accumulator in float64 as
+# each chunk goes by.
+
+import numpy as np
+
+from .breathing import CD_VALVE, D_EXHAUST, D_INTAKE, valve_flow_area
+from .cam_timing import EVC, EVO, IVC, IVO, L_MAX, LOBE_PERIOD, OVERLAP_THRESHOLD
+from .valve_lift import CYCLE_ANGLE, valve_lift
+
+CHUNK_SIZE = 2**15
+
+
+def iter_lift_chunks(n_cycles, resolution=0.01, IVO=IVO, IVC=IVC, EVO=EVO, EVC=EVC, l_max=L_MAX,
+                     d_intake=D_INTAKE, d_exhaust=D_EXHAUST, Cd=CD_VALVE,
+                     threshold=OVERLAP_THRESHOLD, chunk_size=CHUNK_SIZE, dtype=np.float64):
+    """Yield lift, overlap and flow area for ``n_cycles`` 720-degree cycles, chunk by chunk.
+
+    ``resolution`` (deg) must divide 720. Each chunk is a dict with 'start' (index of its
+    first sample in the whole sequence), 'cycle' and 'theta' (cycle number and angle
+    within it), 'intake' and 'exhaust' lift (mm), 'overlap' (the lift both valves share
+    where it exceeds ``threshold``, else 0) and 'intake_area'/'exhaust_area', the effective
+    flow areas (m^2) of ``valve_flow_area``. Arrays other than 'start' and 'cycle' are
+    ``dtype``; the chunk's buffers are reused, so copy anything that has to outlive the
+    next iteration.
+    """
+    per_cycle = int(round(CYCLE_ANGLE / resolution))
+    if not np.isclose(per_cycle * resolution, CYCLE_ANGLE):
+        raise ValueError(f'resolution {resolution} deg does not divide {CYCLE_ANGLE:g} deg')
+    total = int(n_cycles) * per_cycle
+    steps = np.arange(chunk_size, dtype=np.int64)
+    buffers = {name: np.empty(chunk_size, dtype=dtype)
+               for name in ('theta', 'intake', 'exhaust', 'overlap', 'intake_area', 'exhaust_area')}
+
+    for start in range(0, total, chunk_size):
+        n = min(chunk_size, total - start)
+        index = start + steps[:n]
+        theta = (index % per_cycle) * resolution
+        intake = valve_lift(theta, IVO, IVC, l_max, cycle=LOBE_PERIOD)
+        exhaust = valve_lift(theta, EVO, EVC, l_max, cycle=LOBE_PERIOD)
+        overlap = np.minimum(intake, exhaust)
+        overlap[overlap <= threshold] = 0.0
+
+        chunk = {name: buffer[:n] for name, buffer in buffers.items()}
+        chunk['theta'][...] = theta
+        chunk['intake'][...] = intake
+        chunk['exhaust'][...] = exhaust
+        chunk['overlap'][...] = overlap
+        chunk['intake_area'][...] = valve_flow_area(intake * 1e-3, d_intake, Cd)
+        chunk['exhaust_area'][...] = valve_flow_area(exhaust * 1e-3, d_exhaust, Cd)
+        chunk['start'] = start
+        chunk['cycle'] = index // per_cycle
+        yield chunk
+
+
+class LiftStats:
+    """Running statistics of a lift stream, accumulated chunk by chunk in float64.
+
+    Integrals use the rectangle rule with step ``resolution``, which over whole periodic
+    cycles equals the trapezoidal rule. The intake and exhaust integrals are time-area
+    integrals of the effective flow area over crank angle (m^2*deg), the geometric measure
+    of how much a valve lets through; they are not a mass flow, which would also need the
+    pressures across the valve (see ``breathing_map``).
+    """
+
+    def __init__(self, resolution):
+        self.resolution = resolution
+        self.samples = 0
+        self.max_intake = 0.0
+        self.max_exhaust = 0.0
+        self.max_overlap = 0.0
+        self.overlap_duration = 0.0
+        self.overlap_area = 0.0
+        self.intake_time_area = 0.0
+        self.exhaust_time_area = 0.0
+
+    def update(self, chunk):
+        overlap = chunk['overlap']
+        self.samples += overlap.size
+        self.max_intake = max(self.max_intake, float(chunk['intake'].max()))
+        self.max_exhaust = max(self.max_exhaust, float(chunk['exhaust'].max()))
+        self.max_overlap = max(self.max_overlap, float(overlap.max()))
+        self.overlap_duration += int(np.count_nonzero(overlap)) * self.resolution
+        self.overlap_area += float(overlap.sum(dtype=np.float64)) * self.resolution
+        self.intake_time_area += float(chunk['intake_area'].sum(dtype=np.float64)) * self.resolution
+        self.exhaust_time_area += float(chunk['exhaust_area'].sum(dtype=np.float64)) * self.resolution
+
+    def result(self):
+        """Totals so far: maxima (mm), overlap duration (deg) and area (mm*deg), and the
+        intake/exhaust flow-area integrals over crank angle (m^2*deg, not a mass flow), plus
+        per-cycle averages of the sums."""
+        cycles = self.samples * self.resolution / CYCLE_ANGLE
+        totals = {
+            'samples': self.samples,
+            'cycles': cycles,
+            'max_intake_lift': self.max_intake,
+            'max_exhaust_lift': self.max_exhaust,
+            'max_overlap_lift': self.max_overlap,
+            'overlap_duration': self.overlap_duration,
+            'overlap_area': self.overlap_area,
+            'intake_time_area': self.intake_time_area,
+            'exhaust_time_area': self.exhaust_time_area,
+        }
+        if cycles:
+            for name in ('overlap_duration', 'overlap_area', 'intake_time_area', 'exhaust_time_area'):
+                totals[f'{name}_per_cycle'] = totals[name] / cycles
+        return totals
+
+
+def stream_lift_stats(n_cycles, resolution=0.01, **kwargs):
+    """Run ``iter_lift_chunks`` to the end and return the ``LiftStats`` totals."""
+    stats = LiftStats(resolution)
+    for chunk in iter_lift_chunks(n_cycles, resolution, **kwargs):
+        stats.update(chunk)
+    return stats.result()
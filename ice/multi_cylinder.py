@@ -0,0 +1,114 @@
+# Valve lift of a whole multi-cylinder engine, phased by its firing order.
+#
+# Every cylinder runs the single-cylinder valve events of ice.breathing (one intake and
+# one exhaust lobe per 720-degree cycle), shifted by the crank angle at which it fires.
+# Lift for all cylinders comes from one (cylinders x angles) broadcast of valve_lift per
+# valve, and the engine-level quantities (open-valve counts, inter-cylinder intake
+# overlap, summed flow area) are reductions over the cylinder axis.
+
+import numpy as np
+
+from .breathing import CD_VALVE, D_EXHAUST, D_INTAKE, EVC, EVO, IVC, IVO, valve_flow_area
+from .cam_timing import OVERLAP_THRESHOLD
+from .instrument import array_size, timed
+from .valve_lift import CYCLE_ANGLE, valve_lift
+
+# Common firing orders by cylinder count (inline 3/4/5/6, V8 cross-plane, V10, V12)
+FIRING_ORDERS = {
+    1: (1,),
+    2: (1, 2),
+    3: (1, 2, 3),
+    4: (1, 3, 4, 2),
+    5: (1, 2, 4, 5, 3),
+    6: (1, 5, 3, 6, 2, 4),
+    8: (1, 8, 4, 3, 6, 5, 7, 2),
+    10: (1, 6, 5, 10, 2, 7, 3, 8, 4, 9),
+    12: (1, 7, 5, 11, 3, 9, 6, 12, 2, 8, 4, 10),
+}
+
+
+def firing_phases(firing_order=None, n_cylinders=None, firing_angles=None):
+    """Crank angle (deg) at which each cylinder fires, indexed by cylinder number - 1.
+
+    ``firing_order`` lists the cylinder numbers (1-based) in firing sequence; without it
+    the order for ``n_cylinders`` comes from FIRING_ORDERS. The cylinders fire evenly,
+    720/n deg apart, unless ``firing_angles`` gives the angle of each firing in sequence.
+    """
+    if firing_order is None:
+        if n_cylinders not in FIRING_ORDERS:
+            raise ValueError(f'no default firing order for {n_cylinders} cylinders; pass firing_order')
+        firing_order = FIRING_ORDERS[n_cylinders]
+    order = np.asarray(firing_order, dtype=int)
+    n = order.size
+    if n_cylinders is not None and n_cylinders != n:
+        raise ValueError(f'firing order {tuple(order.tolist())} has {n} cylinders, expected {n_cylinders}')
+    if sorted(order.tolist()) != list(range(1, n + 1)):
+        raise ValueError(f'firing order {tuple(order.tolist())} must list cylinders 1..{n} once each')
+
+    if firing_angles is None:
+        firing_angles = np.arange(n) * CYCLE_ANGLE / n
+    firing_angles = np.asarray(firing_angles, dtype=float)
+    if firing_angles.shape != (n,):
+        raise ValueError(f'expected {n} firing angles, got {firing_angles.size}')
+
+    phase = np.empty(n)
+    phase[order - 1] = np.mod(firing_angles, CYCLE_ANGLE)
+    return phase
+
+
+@timed('lift_matrix', samples=array_size('intake'))
+def multi_cylinder_lift(firing_order=None, n_cylinders=None, resolution=0.1, IVO=IVO, IVC=IVC,
+                        EVO=EVO, EVC=EVC, l_max=9.0, d_intake=D_INTAKE, d_exhaust=D_EXHAUST,
+                        Cd=CD_VALVE, threshold=OVERLAP_THRESHOLD, firing_angles=None):
+    """Intake and exhaust lift of every cylinder over one 720-degree cycle, plus engine totals.
+
+    The firing order and phasing are as in ``firing_phases``. Valve events (deg) are those
+    of cylinder 1 firing at 0 deg; l_max is in mm and valve diameters in m. A valve counts
+    as open where its lift exceeds ``threshold`` (mm).
+
+    Returns a dict with theta (deg, uniform over [0, 720) in steps of ``resolution``),
+    phase (firing angle per cylinder), intake and exhaust lift (mm) as (cylinders x angles)
+    arrays with row c - 1 for cylinder c, and per angle: open_intakes and open_exhausts
+    (number of open valves), intake_overlap_lift (the lift of the second most open intake,
+    i.e. the lift two cylinders' intakes share; 0 unless both are open), intake_area and
+    exhaust_area (effective flow areas of ``valve_flow_area`` summed over the cylinders,
+    m^2). Per cycle: intake_overlap_duration (deg with two or more intakes open),
+    intake_pair_overlap (cylinders x cylinders, deg with both intakes open; the diagonal is
+    each intake's open duration) and mean_intake_area / mean_exhaust_area (m^2).
+    """
+    phase = firing_phases(firing_order, n_cylinders, firing_angles)
+    n_angles = int(round(CYCLE_ANGLE / resolution))
+    d_theta = CYCLE_ANGLE / n_angles
+    theta = np.arange(n_angles) * d_theta
+
+    # One broadcast per valve: cylinder offsets down the rows, angles along the columns
+    intake = valve_lift(theta, IVO + phase[:, None], IVC + phase[:, None], l_max)
+    exhaust = valve_lift(theta, EVO + phase[:, None], EVC + phase[:, None], l_max)
+
+    intake_open = intake > threshold
+    exhaust_open = exhaust > threshold
+    open_intakes = np.count_nonzero(intake_open, axis=0)
+    if len(phase) > 1:
+        overlap_lift = np.partition(intake, -2, axis=0)[-2]
+        overlap_lift = np.where(open_intakes >= 2, overlap_lift, 0.0)
+    else:
+        overlap_lift = np.zeros(n_angles)
+    open_mask = intake_open.astype(float)
+
+    intake_area = valve_flow_area(intake * 1e-3, d_intake, Cd).sum(axis=0)
+    exhaust_area = valve_flow_area(exhaust * 1e-3, d_exhaust, Cd).sum(axis=0)
+    return {
+        'theta': theta,
+        'phase': phase,
+        'intake': intake,
+        'exhaust': exhaust,
+        'open_intakes': open_intakes,
+        'open_exhausts': np.count_nonzero(exhaust_open, axis=0),
+        'intake_overlap_lift': overlap_lift,
+        'intake_area': intake_area,
+        'exhaust_area': exhaust_area,
+        'intake_overlap_duration': np.count_nonzero(open_intakes >= 2) * d_theta,
+        'intake_pair_overlap': open_mask @ open_mask.T * d_theta,
+        'mean_intake_area': intake_area.mean(),
+        'mean_exhaust_area': exhaust_area.mean(),
+    }
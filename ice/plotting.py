@@ -0,0 +1,255 @@
+# Figure builders for the ICE project scripts.
+#
+# matplotlib is imported inside each function, so the compute modules (and this one)
+# can be imported by headless batch workers without loading a GUI backend. Every
+# function returns the figure it built; the caller decides whether to show or save it.
+
+import numpy as np
+
+from .instrument import timed
+from .thermo import CURVE_TOL, K, isentropic_curve
+
+# Segments of each cycle's P-v loop: (kind, from state, to state, line style, label),
+# with state indices counted from 0 for state 1
+CYCLE_SEGMENTS = {
+    'dual': [
+        ('isentropic', 0, 1, 'b-', 'Isentropic Compression (1-2)'),
+        ('line', 1, 2, 'r-', 'Constant Volume Heat Addition (2-3)'),
+        ('line', 2, 3, 'r--', 'Constant Pressure Heat Addition (3-4)'),
+        ('isentropic', 3, 4, 'g-', 'Isentropic Expansion (4-5)'),
+        ('line', 4, 0, 'k-', 'Constant Volume Heat Rejection (5-1)'),
+    ],
+    'otto': [
+        ('isentropic', 0, 1, 'b-', 'Isentropic Compression (1-2)'),
+        ('line', 1, 2, 'r-', 'Constant Volume Heat Addition (2-3)'),
+        ('isentropic', 2, 3, 'g-', 'Isentropic Expansion (3-4)'),
+        ('line', 3, 0, 'k-', 'Constant Volume Heat Rejection (4-1)'),
+    ],
+    'diesel': [
+        ('isentropic', 0, 1, 'b-', 'Isentropic Compression (1-2)'),
+        ('line', 1, 2, 'r-', 'Constant Pressure Heat Addition (2-3)'),
+        ('isentropic', 2, 3, 'g-', 'Isentropic Expansion (3-4)'),
+        ('line', 3, 0, 'k-', 'Constant Volume Heat Rejection (4-1)'),
+    ],
+    'atkinson': [
+        ('isentropic', 0, 1, 'b-', 'Isentropic Compression (1-2)'),
+        ('line', 1, 2, 'r-', 'Constant Volume Heat Addition (2-3)'),
+        ('isentropic', 2, 3, 'g-', 'Isentropic Expansion (3-4)'),
+        ('line', 3, 0, 'k-', 'Constant Pressure Heat Rejection (4-1)'),
+    ],
+}
+
+
+def segment_curves(P_states, v_states, cycle, k=K, tol=CURVE_TOL):
+    # (v, P) arrays for every segment of the cycle, in CYCLE_SEGMENTS order. Isentropic
+    # segments are log-spaced to within `tol` and cached, so a compression curve shared
+    # by several cycles is only computed once.
+    curves = []
+    for kind, i, j, _, _ in CYCLE_SEGMENTS[cycle]:
+        if kind == 'isentropic':
+            curves.append(isentropic_curve(P_states[i], v_states[i], v_states[j], k=k, tol=tol))
+        else:
+            curves.append(([v_states[i], v_states[j]], [P_states[i], P_states[j]]))
+    return curves
+
+
+@timed('figure_build')
+def plot_pv_diagram(P_states, v_states, cycle, title, k=K):
+    """P-v diagram of one cycle ('dual', 'otto', 'diesel' or 'atkinson') from its states."""
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(10, 7))
+    for (v, P), (_, _, _, style, label) in zip(segment_curves(P_states, v_states, cycle, k),
+                                                 CYCLE_SEGMENTS[cycle]):
+        ax.plot(v, P, style, label=label)
+
+    # One scatter for all the states rather than a marker line per state
+    ax.scatter(v_states, P_states, s=36, color='black', zorder=3, label='States')
+
+    ax.set_title(title)
+    ax.set_xlabel('Specific Volume (m$^3$/kg)')
+    ax.set_ylabel('Pressure (kPa)')
+    ax.grid(True)
+    ax.legend(loc='upper right', fontsize='small')
+    ax.set_ylim(bottom=0)
+    ax.set_xlim(left=0)
+    fig.tight_layout()
+    return fig
+
+
+# Line style, width and label of each segment in the three-cycle comparison diagram
+COMPARISON_STYLES = {
+    'dual': [
+        ('b-', 2, 'Dual Cycle: Compression (1-2)'),
+        ('r-', 2, 'Dual Cycle: Const. Vol. Heat Add. (2-3)'),
+        ('r--', 2, 'Dual Cycle: Const. Press. Heat Add. (3-4)'),
+        ('g-', 2, 'Dual Cycle: Expansion (4-5)'),
+        ('k-', 2, 'Dual Cycle: Const. Vol. Heat Rej. (5-1)'),
+    ],
+    'otto': [
+        ('b:', 1.5, 'Otto Cycle: Compression (1-2)'),
+        ('m-', 2, 'Otto Cycle: Const. Vol. Heat Add. (2-3)'),
+        ('c:', 1.5, 'Otto Cycle: Expansion (3-4)'),
+        ('y-', 2, 'Otto Cycle: Const. Vol. Heat Rej. (4-1)'),
+    ],
+    'diesel': [
+        ('b--', 1.5, 'Diesel Cycle: Compression (1-2)'),
+        ('tab:orange', 2, 'Diesel Cycle: Const. Press. Heat Add. (2-3)'),
+        ('lightgreen', 2, 'Diesel Cycle: Expansion (3-4)'),
+        ('tab:purple', 2, 'Diesel Cycle: Const. Vol. Heat Rej. (4-1)'),
+    ],
+}
+
+
+@timed('figure_build')
+def plot_cycle_comparison(dual, otto, diesel, rc, k=K):
+    """Dual, Otto and Diesel P-v loops on one diagram, from the cycle result dicts."""
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(12, 8))
+    for cycle, result in (('dual', dual), ('otto', otto), ('diesel', diesel)):
+        curves = segment_curves(result['P'], result['v'], cycle, k)
+        for (v, P), (style, width, label) in zip(curves, COMPARISON_STYLES[cycle]):
+            ax.plot(v, P, style, linewidth=width, label=label)
+
+    # State markers: 1 and 2 are shared, the rest are labelled per cycle
+    P_d, v_d = dual['P'], dual['v']
+    P_o, v_o = otto['P'], otto['v']
+    P_di, v_di = diesel['P'], diesel['v']
+    annotations = [
+        (v_d[0], P_d[0], '1', (-15, -5)),
+        (v_d[1], P_d[1], '2', (5, 10)),
+        (v_d[2], P_d[2], '3 (Dual)', (5, 10)),
+        (v_d[3], P_d[3], '4 (Dual)', (5, 10)),
+        (v_d[4], P_d[4], '5 (Dual)', (-15, 10)),
+        (v_o[2], P_o[2], '3 (Otto)', (5, 10)),
+        (v_o[3], P_o[3], '4 (Otto)', (-15, 10)),
+        (v_di[2], P_di[2], '3 (Diesel)', (5, 10)),
+        (v_di[3], P_di[3], '4 (Diesel)', (-15, 10)),
+    ]
+    for v, P, text, offset in annotations:
+        ax.annotate(text, (v, P), textcoords="offset points", xytext=offset, ha='center')
+    v, P = np.array([(v, P) for v, P, _, _ in annotations]).T
+    ax.scatter(v, P, s=36, color='black', zorder=3)
+
+    ax.set_title(f'P-v Diagram for Dual, Otto, and Diesel Cycles (rc={rc})')
+    ax.set_xlabel('Specific Volume (m$^3$/kg)')
+    ax.set_ylabel('Pressure (kPa)')
+    ax.grid(True)
+    ax.legend(loc='upper left', bbox_to_anchor=(1, 1), borderaxespad=0., fontsize='small')
+    ax.set_ylim(bottom=0)
+    ax.set_xlim(left=0)
+    fig.tight_layout(rect=[0, 0, 0.78, 1])
+    return fig
+
+
+@timed('figure_build')
+def plot_valve_lift(crank_angle, intake_lift, exhaust_lift, l_max, IVO, IVC, EVO, EVC,
+                    overlap_threshold=0.01):
+    """Valve-lift diagram with the event markers and shaded overlap regions."""
+    import matplotlib.pyplot as plt
+
+    from .cam_timing import overlap_regions
+
+    fig, ax = plt.subplots(figsize=(14, 7))
+    ax.plot(crank_angle, intake_lift, label='Intake Valve Lift (mm)', color='blue', linewidth=2)
+    ax.plot(crank_angle, exhaust_lift, label='Exhaust Valve Lift (mm)', color='red', linewidth=2)
+
+    ax.axvline(0, color='gray', linestyle='--', label='TDC/BDC')
+    for angle in (180, 360, 540, 720):
+        ax.axvline(angle, color='gray', linestyle='--')
+
+    events = [
+        (IVO, 'IVO', 'blue', 'left'),
+        (IVC, 'IVC', 'blue', 'right'),
+        (EVO, 'EVO', 'red', 'left'),
+        (EVC, 'EVC', 'red', 'right'),
+        (EVC + 360, 'EVC', 'red', 'right'),  # Second EVC
+    ]
+    for angle, name, color, align in events:
+        ax.axvline(angle, color=color, linestyle=':', linewidth=1)
+        ax.text(angle, l_max * 1.05, f'{name}\n({angle:g}°)', rotation=90, va='bottom', ha=align,
+                color=color, fontsize=9)
+
+    # Highlight valve overlap regions (where both lifts are non-zero); label only the first
+    overlap_lift = np.minimum(intake_lift, exhaust_lift)
+    starts, ends = overlap_regions(overlap_lift > overlap_threshold)
+    for n, (start, end) in enumerate(zip(starts, ends)):
+        ax.fill_between(crank_angle[start:end + 1], 0, l_max, color='purple', alpha=0.1,
+                        label='Valve Overlap' if n == 0 else "")
+
+    ax.set_title('Valve Lift Diagram for a 4-Stroke Diesel Engine (Sinusoidal Profile)')
+    ax.set_xlabel('Crankshaft Angle (°)')
+    ax.set_ylabel('Valve Lift (mm)')
+    ax.grid(True, linestyle='--', alpha=0.7)
+    ax.set_xlim(0, 720)
+    ax.set_ylim(0, l_max * 1.1)
+    ax.set_xticks(np.arange(0, 721, 90))
+    ax.legend()
+    fig.tight_layout()
+    return fig
+
+
+@timed('figure_build')
+def plot_throat_flow(Pt, velocity, mdot, Pt_critical):
+    """Throat velocity and mass flow versus upstream pressure, with the sonic region shaded.
+
+    Returns the velocity and mass-flow figures.
+    """
+    import matplotlib.pyplot as plt
+
+    Pt = np.asarray(Pt)
+    sonic = Pt >= Pt_critical
+    figures = []
+    panels = [
+        (velocity, 'blue', 'Throat Velocity ($V_t$)', 'Throat Velocity ($V_t$) (m/s)'),
+        (mdot, 'purple', r'Mass Flow Rate ($\dot{m}$)', r'Mass Flow Rate ($\dot{m}$) (kg/s)'),
+    ]
+    for values, color, name, ylabel in panels:
+        fig, ax = plt.subplots(figsize=(12, 6))
+        ax.plot(Pt / 1000, values, color=color, label=name)
+        ax.axvline(x=Pt_critical / 1000, color='red', linestyle='--', label='Sonic/Subsonic Boundary')
+        ax.fill_between(Pt / 1000, 0, values, where=sonic, color='orange', alpha=0.2, label='Sonic Region')
+        ax.fill_between(Pt / 1000, 0, values, where=~sonic, color='green', alpha=0.2, label='Subsonic Region')
+
+        ax.set_title(f'{name} vs. Upstream Pressure ($P_t$)')
+        ax.set_xlabel('Upstream Pressure ($P_t$) (kPa)')
+        ax.set_ylabel(ylabel)
+        ax.grid(True, linestyle='--', alpha=0.7)
+        ax.legend()
+        fig.tight_layout()
+        figures.append(fig)
+    return figures
+
+
+@timed('figure_build')
+def plot_atkinson_maps(rc, re, result, levels=20):
+    """Efficiency and net-work contour maps from a precomputed ``atkinson_cycle`` grid.
+
+    ``rc`` and ``re`` are the 1-D axes the grid was evaluated on (rc along rows, re along
+    columns). Degenerate points (re <= rc) are left blank. Returns the figure.
+    """
+    import matplotlib.pyplot as plt
+
+    rc = np.ravel(rc)
+    re = np.ravel(re)
+    valid = result['valid']
+
+    fig, axes = plt.subplots(1, 2, figsize=(14, 6))
+    panels = [
+        (result['eta'] * 100, 'Thermal Efficiency (%)'),
+        (result['w_net'], 'Net Work (kJ/kg)'),
+    ]
+    for ax, (values, title) in zip(axes, panels):
+        values = np.ma.masked_where(~valid, values)
+        contours = ax.contourf(re, rc, values, levels=levels, cmap='viridis')
+        fig.colorbar(contours, ax=ax)
+        ax.plot(re, re, 'k--', linewidth=1, label='re = rc')
+        ax.set_title(f'Atkinson Cycle {title}')
+        ax.set_xlabel('Expansion Ratio (re)')
+        ax.set_ylabel('Compression Ratio (rc)')
+        ax.set_xlim(re.min(), re.max())
+        ax.set_ylim(rc.min(), rc.max())
+        ax.legend(loc='upper left', fontsize='small')
+    fig.tight_layout()
+    return fig
@@ -0,0 +1,262 @@
+# Non-interactive batch rendering of P-v and valve-lift diagrams to image files.
+#
+# Each worker process builds one Agg figure per diagram kind and keeps it for every job it
+# receives: the line artists are updated with set_data, state markers are one scatter per
+# cycle, and only the data-dependent pieces (overlap shading, titles) are replaced. No
+# pyplot state is involved, so nothing here needs a display.
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .cam_timing import LOBE_PERIOD, OVERLAP_THRESHOLD, overlap_regions
+from .cycles import atkinson_cycle, compare_cycles, diesel_cycle, dual_cycle, otto_cycle
+from .instrument import drain, merge, pool_initializer, span, timed
+from .plotting import COMPARISON_STYLES, CYCLE_SEGMENTS, segment_curves
+from .thermo import CURVE_TOL, K
+from .valve_lift import valve_lift
+
+CYCLE_MODELS = {
+    'dual': dual_cycle,
+    'otto': otto_cycle,
+    'diesel': diesel_cycle,
+    'atkinson': atkinson_cycle,
+}
+
+CYCLE_TITLES = {
+    'dual': 'P-v Diagram for Dual Cycle (rc={rc:g}, rp={rp:g})',
+    'otto': 'P-v Diagram for Otto Cycle (rc={rc:g})',
+    'diesel': 'P-v Diagram for Diesel Cycle (rc={rc:g})',
+    'atkinson': 'P-v Diagram for Atkinson Cycle (rc={rc:g}, re={re:g})',
+}
+
+
+def _new_figure(figsize):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig, fig.add_subplot()
+
+
+class PVRenderer:
+    """Reusable P-v figure for one cycle type, or for the dual/Otto/Diesel comparison.
+
+    Draws on ``ax`` if given (e.g. a pyplot axes of the interactive explorer), otherwise
+    on a new off-screen figure; ``tol`` sets the isentropic curve resolution.
+    """
+
+    def __init__(self, kind, ax=None, tol=CURVE_TOL):
+        self.kind = kind
+        self.tol = tol
+        self.cycles = ('dual', 'otto', 'diesel') if kind == 'comparison' else (kind,)
+        if ax is None:
+            self.fig, self.ax = _new_figure((12, 8) if kind == 'comparison' else (10, 7))
+        else:
+            self.fig, self.ax = ax.figure, ax
+
+        self.lines = {}
+        self.markers = {}
+        for cycle in self.cycles:
+            if kind == 'comparison':
+                styles = COMPARISON_STYLES[cycle]
+            else:
+                styles = [(style, 1.5, label) for _, _, _, style, label in CYCLE_SEGMENTS[cycle]]
+            self.lines[cycle] = [self.ax.plot([], [], style, linewidth=width, label=label)[0]
+                                 for style, width, label in styles]
+            self.markers[cycle] = self.ax.scatter([], [], s=36, color='black', zorder=3,
+                                                  label='States' if kind != 'comparison' else None)
+
+        # Placeholder title so tight_layout leaves room for the per-frame one
+        self.ax.set_title('P-v Diagram')
+        self.ax.set_xlabel('Specific Volume (m$^3$/kg)')
+        self.ax.set_ylabel('Pressure (kPa)')
+        self.ax.grid(True)
+        if kind == 'comparison':
+            self.ax.legend(loc='upper left', bbox_to_anchor=(1, 1), borderaxespad=0., fontsize='small')
+        else:
+            self.ax.legend(loc='upper right', fontsize='small')
+        if ax is None:
+            self.fig.tight_layout(rect=[0, 0, 0.78, 1] if kind == 'comparison' else None)
+
+    @property
+    def artists(self):
+        # Everything update() changes
+        return [self.ax.title, *(line for lines in self.lines.values() for line in lines),
+                *self.markers.values()]
+
+    def update(self, results, title, k=K, autoscale=True):
+        # results maps each cycle name to its result dict (P and v state arrays)
+        for cycle in self.cycles:
+            P_states, v_states = results[cycle]['P'], results[cycle]['v']
+            for line, (v, P) in zip(self.lines[cycle], segment_curves(P_states, v_states, cycle, k, self.tol)):
+                line.set_data(v, P)
+            self.markers[cycle].set_offsets(np.column_stack((v_states, P_states)))
+
+        self.ax.set_title(title)
+        if autoscale:
+            self.rescale()
+
+    def rescale(self):
+        self.ax.relim()
+        self.ax.autoscale_view()
+        # auto=None keeps autoscaling on for the next frame
+        self.ax.set_ylim(bottom=0, auto=None)
+        self.ax.set_xlim(left=0, auto=None)
+
+
+class ValveLiftRenderer:
+    """Reusable valve-lift figure over one 720-degree diagram.
+
+    A valve's lift is only recomputed when its own timing or l_max changes. Draws on
+    ``ax`` if given, otherwise on a new off-screen figure.
+    """
+
+    def __init__(self, resolution=0.5, ax=None):
+        from matplotlib.collections import PolyCollection
+
+        self.crank_angle = np.arange(0, 720 + resolution, resolution)
+        own_figure = ax is None
+        if own_figure:
+            self.fig, self.ax = _new_figure((14, 7))
+        else:
+            self.fig, self.ax = ax.figure, ax
+        ax = self.ax
+        self._lift_cache = {}
+
+        self.intake, = ax.plot([], [], label='Intake Valve Lift (mm)', color='blue', linewidth=2)
+        self.exhaust, = ax.plot([], [], label='Exhaust Valve Lift (mm)', color='red', linewidth=2)
+        ax.axvline(0, color='gray', linestyle='--', label='TDC/BDC')
+        for angle in (180, 360, 540, 720):
+            ax.axvline(angle, color='gray', linestyle='--')
+
+        self.events = []
+        for name, color, align in (('IVO', 'blue', 'left'), ('IVC', 'blue', 'right'),
+                                   ('EVO', 'red', 'left'), ('EVC', 'red', 'right'),
+                                   ('EVC', 'red', 'right')):
+            line = ax.axvline(0, color=color, linestyle=':', linewidth=1)
+            text = ax.text(0, 0, name, rotation=90, va='bottom', ha=align, color=color, fontsize=9)
+            self.events.append((name, line, text))
+
+        # One collection holds the overlap shading; update() replaces its polygons
+        self.overlap = PolyCollection([], color='purple', alpha=0.1, label='Valve Overlap')
+        ax.add_collection(self.overlap, autolim=False)
+        ax.set_title('Valve Lift Diagram for a 4-Stroke Diesel Engine (Sinusoidal Profile)')
+        ax.set_xlabel('Crankshaft Angle (°)')
+        ax.set_ylabel('Valve Lift (mm)')
+        ax.grid(True, linestyle='--', alpha=0.7)
+        ax.set_xlim(0, 720)
+        ax.set_xticks(np.arange(0, 721, 90))
+        ax.legend()
+        if own_figure:
+            self.fig.tight_layout()
+
+    @property
+    def artists(self):
+        # Everything update() changes
+        moving = [self.intake, self.exhaust, self.overlap]
+        for _, line, text in self.events:
+            moving += [line, text]
+        return moving
+
+    def _lift(self, valve, theta_open, theta_close, l_max):
+        key = (theta_open, theta_close, l_max)
+        cached = self._lift_cache.get(valve)
+        if cached is None or cached[0] != key:
+            cached = key, valve_lift(self.crank_angle, theta_open, theta_close, l_max, cycle=LOBE_PERIOD)
+            self._lift_cache[valve] = cached
+        return cached[1]
+
+    def update(self, IVO, IVC, EVO, EVC, l_max, rescale=True):
+        theta = self.crank_angle
+        intake = self._lift('intake', IVO, IVC, l_max)
+        exhaust = self._lift('exhaust', EVO, EVC, l_max)
+        self.intake.set_data(theta, intake)
+        self.exhaust.set_data(theta, exhaust)
+
+        # Events as in the lift script (EVC = 10 deg ATDC), each lobe repeating after 360 deg
+        for (name, line, text), angle in zip(self.events, (IVO, IVC, EVO, EVC, (EVC + 360) % 720)):
+            line.set_xdata([angle, angle])
+            text.set_position((angle, l_max * 1.05))
+            text.set_text(f'{name}\n({angle:g}°)')
+
+        # One rectangle per overlap region, from its first to its last overlapping sample
+        starts, ends = overlap_regions(np.minimum(intake, exhaust) > OVERLAP_THRESHOLD)
+        self.overlap.set_verts([[(theta[start], 0), (theta[end], 0), (theta[end], l_max), (theta[start], l_max)]
+                                for start, end in zip(starts, ends)])
+        if rescale:
+            self.ax.set_ylim(0, l_max * 1.1)
+
+
+# Renderers owned by this (worker) process, created on first use and reused afterwards
+_RENDERERS = {}
+
+
+def _renderer(kind):
+    if kind not in _RENDERERS:
+        _RENDERERS[kind] = ValveLiftRenderer() if kind == 'valve_lift' else PVRenderer(kind)
+    return _RENDERERS[kind]
+
+
+@timed('render')
+def render_job(job, out_dir, formats=('png',), dpi=100):
+    """Render one parameter set and return the paths written.
+
+    ``job`` is a dict with 'kind' ('dual', 'otto', 'diesel', 'atkinson', 'comparison' or
+    'valve_lift'), a 'name' for the output files, and the model's keyword arguments, e.g.
+    {'kind': 'dual', 'name': 'dual_rc14', 'rc': 14, 'rp': 1.7}. For 'comparison' the
+    arguments are those of ``compare_cycles``; for 'valve_lift' they are IVO, IVC, EVO, EVC
+    and l_max as in the lift script.
+    """
+    params = dict(job)
+    kind = params.pop('kind')
+    name = params.pop('name')
+    renderer = _renderer(kind)
+
+    if kind == 'valve_lift':
+        renderer.update(**params)
+    elif kind == 'comparison':
+        results = compare_cycles(**params)
+        renderer.update(results, f"P-v Diagram for Dual, Otto, and Diesel Cycles (rc={params['rc']:g})",
+                        k=params.get('k', K))
+    else:
+        results = {kind: CYCLE_MODELS[kind](**params)}
+        renderer.update(results, CYCLE_TITLES[kind].format(**params), k=params.get('k', K))
+
+    paths = []
+    for fmt in formats:
+        path = os.path.join(out_dir, f'{name}.{fmt}')
+        with span('savefig'):
+            renderer.fig.savefig(path, format=fmt, dpi=dpi)
+        paths.append(path)
+    return paths
+
+
+def _render_chunk(jobs, out_dir, formats, dpi, collect=False):
+    # With ``collect`` (in a pool worker) also return the worker's drain()
+    paths = [render_job(job, out_dir, formats, dpi) for job in jobs]
+    return (paths, drain()) if collect else paths
+
+
+def render_batch(jobs, out_dir, formats=('png',), dpi=100, max_workers=None, chunk_size=16):
+    """Render many parameter sets to ``out_dir`` with a process pool.
+
+    Jobs are sent to the workers in chunks of ``chunk_size`` so each worker reuses its
+    figures across a run of frames. Returns the written paths, in job order.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    jobs = list(jobs)
+    chunks = [jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+    if max_workers == 1:
+        done = [_render_chunk(chunk, out_dir, formats, dpi) for chunk in chunks]
+    else:
+        n = len(chunks)
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=pool_initializer()) as pool:
+            done = []
+            for paths, recorded in pool.map(_render_chunk, chunks, [out_dir] * n, [formats] * n,
+                                            [dpi] * n, [True] * n):
+                merge(recorded)
+                done.append(paths)
+    return [path for chunk in done for paths in chunk for path in paths]
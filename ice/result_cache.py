@@ -0,0 +1,234 @@
+# Content-addressed on-disk cache for model results.
+#
+# A result is stored under the SHA-256 of the model name, its version and the bound call
+# arguments (defaults applied, numbers hashed as float64 bytes, so rc=14 and rc=14.0 are the
+# same entry). Each entry is a single uncompressed .npz (a zip of .npy arrays) written to a
+# temporary name and moved into place with os.replace, so a concurrent reader sees either
+# the whole entry or none. A file's mtime is its last use; when the directory grows past
+# max_bytes the least recently used entries are deleted. Each cache keeps a running total
+# of what it has written, so the directory is only walked when that total passes the
+# limit; the walk also removes temporaries left behind by killed writers.
+
+import hashlib
+import inspect
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from .cycles import compare_cycles
+from .throat_flow import throat_flow
+
+CACHE_DIR = os.environ.get('ICE_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'ice'))
+MAX_BYTES = 256 * 2**20
+
+# Bump when a model's equations change so old entries stop matching
+MODEL_VERSION = 1
+
+# A sweep triggered by a write evicts down to this fraction of max_bytes, so the next
+# few writes fit without walking the directory again
+EVICT_FRACTION = 0.9
+
+# Age (s) after which a .tmp file is taken to be left over from a writer that died
+STALE_TMP_AGE = 3600
+
+_SEPARATOR = '.'
+
+
+def _hash_value(digest, value):
+    array = np.asarray(value)
+    if array.dtype.kind in 'iuf':
+        array = array.astype(np.float64)
+    elif array.dtype.kind == 'O':
+        digest.update(repr(value).encode())
+        return
+    digest.update(f'{array.dtype.str}{array.shape}'.encode())
+    digest.update(np.ascontiguousarray(array).tobytes())
+
+
+def cache_key(name, version, arguments):
+    """Hex digest identifying one evaluation: model name, version and argument dict."""
+    digest = hashlib.sha256(f'{name}\0{version}\0'.encode())
+    for arg in sorted(arguments):
+        digest.update(f'\0{arg}='.encode())
+        _hash_value(digest, arguments[arg])
+    return digest.hexdigest()
+
+
+def _flatten(result, prefix=''):
+    # Nested result dicts (e.g. compare_cycles) become 'dual.P'-style array names
+    flat = {}
+    for key, value in result.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f'{prefix}{key}{_SEPARATOR}'))
+        else:
+            flat[f'{prefix}{key}'] = np.asarray(value)
+    return flat
+
+
+def _unflatten(flat):
+    result = {}
+    for name, value in flat.items():
+        *parents, key = name.split(_SEPARATOR)
+        node = result
+        for parent in parents:
+            node = node.setdefault(parent, {})
+        node[key] = value
+    return result
+
+
+class ResultCache:
+    """Size-bounded LRU cache of result dicts in ``directory``.
+
+    Several processes may read and write the same directory; entries are never modified
+    in place, and a reader that loses a race with eviction just sees a miss.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size = None  # bytes in the directory as of the last sweep, plus our writes since
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.npz')
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                flat = {name: data[name] for name in data.files}
+            os.utime(path)
+        except (OSError, ValueError):
+            # Missing, evicted while we were reading, or not a complete archive
+            self.misses += 1
+            return None
+        self.hits += 1
+        return _unflatten(flat)
+
+    def put(self, key, result):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **_flatten(result))
+            size = os.path.getsize(tmp)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        # Other processes' writes are not counted here; their own sweeps keep the directory
+        # near the limit, and ours re-reads the real size whenever it runs
+        if self._size is None or self._size + size > self.max_bytes:
+            self.evict(self.max_bytes * EVICT_FRACTION)
+        else:
+            self._size += size
+
+    def _scan(self):
+        # (mtime, size, path) of every stored entry, and the paths of stale temporaries
+        found, stale = [], []
+        cutoff = time.time() - STALE_TMP_AGE
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(('.npz', '.tmp')):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if name.endswith('.npz'):
+                    found.append((stat.st_mtime, stat.st_size, path))
+                elif stat.st_mtime < cutoff:
+                    stale.append(path)
+        return found, stale
+
+    def entries(self):
+        # (mtime, size, path) of every stored entry
+        return self._scan()[0]
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, max_bytes=None):
+        """Delete least recently used entries until the cache fits in ``max_bytes``, and
+        temporaries older than STALE_TMP_AGE that an interrupted write left behind."""
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        entries, stale = self._scan()
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= limit:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass  # another process evicted it first
+            total -= size
+        for path in stale:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+        self._size = total
+
+    def clear(self):
+        self.evict(0)
+
+    def memoize(self, function, name=None, version=MODEL_VERSION):
+        """Wrap a function that returns a dict of arrays so repeated calls load from disk.
+
+        Positional and keyword arguments are bound against the function's signature with
+        defaults applied, so equivalent calls share an entry.
+        """
+        signature = inspect.signature(function)
+        name = name or f'{function.__module__}.{function.__qualname__}'
+
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = cache_key(name, version, bound.arguments)
+            result = self.get(key)
+            if result is None:
+                result = function(*args, **kwargs)
+                self.put(key, result)
+            return result
+
+        wrapper.__name__ = function.__name__
+        wrapper.__doc__ = function.__doc__
+        wrapper.cache = self
+        return wrapper
+
+
+_default_cache = None
+_default_wrappers = {}
+
+
+def default_cache():
+    # Shared ResultCache in CACHE_DIR, created on first use
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ResultCache()
+    return _default_cache
+
+
+def _default_memoized(function):
+    # memoize() inspects the signature, so each wrapper is built once and kept
+    wrapper = _default_wrappers.get(function)
+    if wrapper is None:
+        wrapper = _default_wrappers[function] = default_cache().memoize(function)
+    return wrapper
+
+
+def cached_compare_cycles(*args, **kwargs):
+    """``compare_cycles`` through the default on-disk cache."""
+    return _default_memoized(compare_cycles)(*args, **kwargs)
+
+
+def cached_throat_flow(*args, **kwargs):
+    """``throat_flow`` through the default on-disk cache."""
+    return _default_memoized(throat_flow)(*args, **kwargs)
@@ -0,0 +1,241 @@
+# Crank-angle resolved, single-zone model of the closed part of the engine cycle.
+#
+# The charge is an ideal gas with constant k in a slider-crank cylinder. Each fixed crank
+# step is split into an isentropic half-step to the mid-step volume, the step's heat release
+# at constant volume, and a second isentropic half-step. The isentropic parts are exact
+# (T*V^(k-1) is carried across them), so the only discretization error comes from where the
+# heat goes in, and with no heat release the model matches the ideal polytropes exactly.
+# Every operating point in a batch advances together, one array operation per step.
+
+import numpy as np
+
+from .breathing import EVO, IVC
+from .cycles import T_MAX, _result, default_cutoff_ratio
+from .engine_geometry import BORE, CONROD, RC, STROKE, cylinder_volume, displacement_volume
+from .instrument import array_size, timed
+from .thermo import CP, CV, K, P1, T1
+
+# Wiebe defaults: start of combustion (deg, 0 = firing TDC), burn duration (deg), efficiency
+# and form factors
+THETA_SOC = -10.0
+BURN_DURATION = 60.0
+WIEBE_A = 5.0
+WIEBE_M = 2.0
+
+
+def wiebe_fraction(theta, theta_start=THETA_SOC, duration=BURN_DURATION, a=WIEBE_A, m=WIEBE_M):
+    """Burned mass fraction x_b = 1 - exp(-a*((theta - theta_start)/duration)^(m+1)).
+
+    Zero before theta_start; all arguments broadcast.
+    """
+    theta, theta_start, duration, a, m = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (theta, theta_start, duration, a, m)))
+    progress = np.clip((theta - theta_start) / duration, 0.0, None)
+    return 1 - np.exp(-a * progress**(m + 1))
+
+
+def _isentropic(T, V_from, V_to, k):
+    return T * (V_from / V_to)**(k - 1)
+
+
+@timed('simulation', samples=array_size('work'))
+def simulate_cycle(qin, rc=RC, theta_start=THETA_SOC, duration=BURN_DURATION, a=WIEBE_A,
+                   m=WIEBE_M, P_ivc=P1, T_ivc=T1, IVC=IVC, EVO=EVO, bore=BORE, stroke=STROKE,
+                   conrod=CONROD, k=K, cp=CP, cv=CV, d_theta=0.1, history=True):
+    """P(theta) and T(theta) from intake closing to exhaust opening with Wiebe heat release.
+
+    ``qin`` is the heat released per kg of trapped charge (kJ/kg), as in the ideal-cycle
+    scripts, and the charge is trapped at (P_ivc kPa, T_ivc K) when the intake closes. Valve
+    angles use the 720-degree convention of ``ice.breathing`` (IVC after gas-exchange TDC
+    is taken one cycle back, before firing TDC). The walls are adiabatic. Every argument
+    except ``d_theta`` and ``history`` broadcasts, and the batch is integrated together
+    from the earliest IVC to the latest EVO; before its own IVC and after its own EVO a
+    point simply does not change.
+
+    Returns a dict with trapped_mass (kg), work (kJ, closed-cycle indicated work),
+    imep (kPa, work over displacement), P_max (kPa), theta_P_max and T_max (K). With
+    ``history=True`` it also holds theta (deg) and, with a trailing angle axis, P, T and V.
+    """
+    (qin, rc, theta_start, duration, a, m, P_ivc, T_ivc, IVC, EVO, bore, stroke, conrod,
+     k, cp, cv) = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (
+        qin, rc, theta_start, duration, a, m, P_ivc, T_ivc, IVC, EVO, bore, stroke, conrod,
+        k, cp, cv)))
+    shape = qin.shape
+    R_air = cp - cv
+
+    # IVC is after gas-exchange TDC (360); move it onto the compression stroke of the same
+    # firing, before 0
+    IVC = np.where(IVC > 360, IVC - 720, IVC)
+    theta_first = float(IVC.min())
+    n_steps = int(np.ceil((float(EVO.max()) - theta_first) / d_theta))
+    theta = theta_first + d_theta * np.arange(n_steps + 1)
+
+    geometry = (bore, stroke, conrod, rc)
+    V = cylinder_volume(IVC, *geometry)
+    mass = P_ivc * V / (R_air * T_ivc)
+    T = T_ivc.copy()
+    Q_total = mass * qin
+    work = np.zeros(shape)
+    P_max = P_ivc.copy()
+    theta_P_max = IVC.copy()
+    T_peak = T.copy()
+
+    if history:
+        P_hist = np.empty(shape + (n_steps + 1,))
+        T_hist = np.empty(shape + (n_steps + 1,))
+        V_hist = np.empty(shape + (n_steps + 1,))
+
+    V_cur = V
+    x_cur = wiebe_fraction(IVC, theta_start, duration, a, m)
+    for i in range(n_steps + 1):
+        if history:
+            V_hist[..., i] = V_cur
+            T_hist[..., i] = T
+            P_hist[..., i] = mass * R_air * T / V_cur
+        if i == n_steps:
+            break
+
+        # Each point only moves inside its own IVC..EVO window; the step is clipped to it,
+        # and the start of the step is where the previous one ended
+        lo = np.clip(theta[i], IVC, EVO)
+        hi = np.clip(theta[i + 1], IVC, EVO)
+        V_mid = cylinder_volume((lo + hi) / 2, *geometry)
+        V_hi = cylinder_volume(hi, *geometry)
+        x_hi = wiebe_fraction(hi, theta_start, duration, a, m)
+        dQ = Q_total * (x_hi - x_cur)
+
+        T_mid = _isentropic(T, V_cur, V_mid, k)
+        T_heated = T_mid + dQ / (mass * cv)
+        T_new = _isentropic(T_heated, V_mid, V_hi, k)
+        # Work of the two isentropic half-steps; the heat is added at constant volume
+        work += mass * cv * ((T - T_mid) + (T_heated - T_new))
+        T = T_new
+
+        V_cur = V_hi
+        x_cur = x_hi
+        P = mass * R_air * T / V_hi
+        higher = P > P_max
+        P_max = np.where(higher, P, P_max)
+        theta_P_max = np.where(higher, hi, theta_P_max)
+        T_peak = np.maximum(T_peak, T)
+
+    result = {
+        'trapped_mass': mass,
+        'work': work,
+        'imep': work / displacement_volume(bore, stroke),
+        'P_max': P_max,
+        'theta_P_max': theta_P_max,
+        'T_max': T_peak,
+    }
+    if history:
+        result.update({'theta': theta, 'P': P_hist, 'T': T_hist, 'V': V_hist})
+    return result
+
+
+@timed('simulation', samples=array_size('eta'))
+def simulate_ideal_cycle(cycle, rc=RC, qin=None, rp=None, alpha=None, P1=P1, T1=T1, k=K,
+                         cp=CP, cv=CV, T_max=T_MAX, bore=BORE, stroke=STROKE, conrod=CONROD,
+                         d_theta=0.1, history=True):
+    """Validation mode: the ideal 'otto', 'diesel' or 'dual' cycle run through the simulator.
+
+    The charge is compressed from BDC to BDC through the slider-crank volume, heat goes in
+    instantaneously at TDC (constant volume) and then at constant pressure until the
+    cutoff volume, as in ``ice.cycles``. Otto and Diesel take ``qin`` (kJ/kg), the dual
+    cycle rp and alpha with the same defaults and T_max limit as ``dual_cycle``.
+
+    Returns the same dict as the matching ``ice.cycles`` function (corner states with a
+    trailing state axis, qin, qout, w_net, eta, mep), plus w_integrated, the net work
+    (kJ/kg) summed along the crank-angle trace, and with ``history=True`` theta and the
+    traces P_theta, T_theta and v_theta (trailing angle axis).
+    """
+    if cycle not in ('otto', 'diesel', 'dual'):
+        raise ValueError(f"unknown cycle {cycle!r}, expected 'otto', 'diesel' or 'dual'")
+    if cycle == 'dual':
+        if rp is None:
+            raise ValueError('the dual cycle needs rp')
+        if alpha is None:
+            alpha = default_cutoff_ratio(rc)
+        qin = 0.0
+    else:
+        if qin is None:
+            raise ValueError(f'the {cycle} cycle needs qin')
+        rp = alpha = 1.0
+
+    rc, qin, rp, alpha, P1, T1, k, T_max, bore, stroke, conrod = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (rc, qin, rp, alpha, P1, T1, k, T_max, bore,
+                                              stroke, conrod)))
+    R_air = cp - cv
+    geometry = (bore, stroke, conrod, rc)
+
+    # Steps land exactly on TDC
+    n_half = int(np.ceil(180 / d_theta))
+    theta = np.linspace(-180, 180, 2 * n_half + 1)
+    V = cylinder_volume(theta[0], *geometry)
+    mass = P1 * V / (R_air * T1)
+    T = T1.copy()
+    w = np.zeros(rc.shape)
+
+    if history:
+        P_hist = np.empty(rc.shape + (theta.size,))
+        T_hist = np.empty(rc.shape + (theta.size,))
+        v_hist = np.empty(rc.shape + (theta.size,))
+
+    for i in range(theta.size):
+        V = cylinder_volume(theta[i], *geometry)
+        if i == n_half:
+            # Firing TDC: state 2, then constant-volume heat to state 3 and the cutoff volume
+            T2, V2 = T, V
+            if cycle == 'otto':
+                rp = 1 + qin / (cv * T2)
+            elif cycle == 'diesel':
+                alpha = 1 + qin / (cp * T2)
+            else:
+                limited = rp * T2 * alpha > T_max
+                alpha = np.where(limited, T_max / (rp * T2), alpha)
+            T = T2 * rp
+            T3 = T
+            V_cut = V2 * alpha
+            T4 = T3 * alpha
+        if history:
+            P_hist[..., i] = mass * R_air * T / V
+            T_hist[..., i] = T
+            v_hist[..., i] = V / mass
+        if i == theta.size - 1:
+            break
+
+        V_next = cylinder_volume(theta[i + 1], *geometry)
+        if i < n_half:
+            T_next = _isentropic(T, V, V_next, k)
+            w += cv * (T - T_next)
+        else:
+            # Constant pressure up to the cutoff volume (T follows V), isentropic after it
+            V_end = np.clip(V_cut, V, V_next)
+            T_cp = T * V_end / V
+            T_next = _isentropic(T_cp, V_end, V_next, k)
+            w += R_air * (T_cp - T) + cv * (T_cp - T_next)
+        T = T_next
+
+    T_end = T
+    P2, P3 = P1 * rc * T2 / T1, P1 * rc * T3 / T1
+    v1, v2 = V / mass, V2 / mass
+    v4 = V_cut / mass
+    P4 = P3
+    P_end = P1 * T_end / T1
+
+    heat_in = cv * (T3 - T2) + cp * (T4 - T3)
+    qout = cv * (T_end - T1)
+    if cycle == 'otto':
+        result = _result((P1, P2, P3, P_end), (v1, v2, v2, v1), (T1, T2, T3, T_end), heat_in, qout)
+    elif cycle == 'diesel':
+        result = _result((P1, P2, P4, P_end), (v1, v2, v4, v1), (T1, T2, T4, T_end), heat_in, qout)
+        result['alpha'] = alpha
+    else:
+        result = _result((P1, P2, P3, P4, P_end), (v1, v2, v2, v4, v1), (T1, T2, T3, T4, T_end),
+                         heat_in, qout)
+        result['alpha'] = alpha
+        result['T_max_limited'] = limited
+        result['valid'] = T3 <= T_max
+    result['w_integrated'] = w
+    if history:
+        result.update({'theta': theta, 'P_theta': P_hist, 'T_theta': T_hist, 'v_theta': v_hist})
+    return result
@@ -0,0 +1,155 @@
+# Columnar store of cycle states: one record per (operating point, cycle, state).
+#
+# Records share one fixed-size structured dtype (P, v, T, point index, cycle tag, state
+# number; 32 bytes), so millions of evaluated cycles sit in a single contiguous array.
+# Columns are views into it, derived quantities are computed from those views on
+# request, and the array goes to and from .npy as is: np.save writes the buffer without
+# conversion and np.load can memory-map it back, so a saved store opens instantly however
+# large it is. A store can also be created directly on disk and filled batch by batch.
+
+import numpy as np
+
+from .thermo import CP, CV, P1, T1
+
+STATE_DTYPE = np.dtype([
+    ('P', np.float64),      # kPa
+    ('v', np.float64),      # m^3/kg
+    ('T', np.float64),      # K
+    ('index', np.uint32),   # operating point, shared by the cycles evaluated at it
+    ('cycle', np.uint8),    # position in CYCLE_TYPES
+    ('state', np.uint8),    # state number, 1-based as in the cycle diagrams
+], align=True)
+
+CYCLE_TYPES = ('otto', 'diesel', 'dual', 'atkinson')
+
+# Derived column name -> function of (records, cp, cv, P_ref, T_ref); units kJ/kg, kg/m^3, kJ/(kg*K)
+DERIVED = {
+    'u': lambda r, cp, cv, P_ref, T_ref: cv * r['T'],
+    'h': lambda r, cp, cv, P_ref, T_ref: cp * r['T'],
+    'Pv': lambda r, cp, cv, P_ref, T_ref: r['P'] * r['v'],
+    'rho': lambda r, cp, cv, P_ref, T_ref: 1 / r['v'],
+    's': lambda r, cp, cv, P_ref, T_ref: cp * np.log(r['T'] / T_ref) - (cp - cv) * np.log(r['P'] / P_ref),
+}
+
+
+def cycle_code(cycle):
+    if cycle not in CYCLE_TYPES:
+        raise ValueError(f"unknown cycle {cycle!r}, expected one of {', '.join(CYCLE_TYPES)}")
+    return CYCLE_TYPES.index(cycle)
+
+
+def state_records(result, cycle, first_index=0, out=None):
+    """Records for a cycle result (a dict with P, v and T carrying a trailing state axis).
+
+    Operating points are numbered in C order of the result's batch shape, starting at
+    ``first_index``. The records are written into ``out`` if given (e.g. a slice of an
+    on-disk store), which must hold exactly points x states records.
+    """
+    P, v, T = (np.asarray(result[name], dtype=float) for name in ('P', 'v', 'T'))
+    n_states = P.shape[-1]
+    n_points = P.size // n_states
+    if first_index + n_points > np.iinfo(np.uint32).max:
+        raise ValueError('operating point index exceeds the uint32 index column')
+    if out is None:
+        out = np.empty(P.size, dtype=STATE_DTYPE)
+    elif out.shape != (P.size,):
+        raise ValueError(f'out holds {out.size} records, the result has {P.size}')
+
+    out['P'] = P.reshape(-1)
+    out['v'] = v.reshape(-1)
+    out['T'] = T.reshape(-1)
+    out['index'].reshape(n_points, n_states)[...] = np.arange(first_index, first_index + n_points)[:, None]
+    out['cycle'] = cycle_code(cycle)
+    out['state'].reshape(n_points, n_states)[...] = np.arange(1, n_states + 1)
+    return out
+
+
+class StateStore:
+    """Cycle states held in one structured array of STATE_DTYPE records."""
+
+    def __init__(self, records):
+        records = np.asanyarray(records)
+        if records.dtype != STATE_DTYPE or records.ndim != 1:
+            raise ValueError('records must be a 1-D array of STATE_DTYPE')
+        self.records = records
+
+    @classmethod
+    def from_results(cls, results, first_index=0):
+        """Store for a mapping of cycle name -> cycle result, e.g. the output of
+        ``compare_cycles``; entries that are not cycle results (like 'qin') are skipped."""
+        blocks = [(name, result) for name, result in results.items()
+                  if isinstance(result, dict) and name in CYCLE_TYPES]
+        size = sum(np.size(result['P']) for _, result in blocks)
+        store = cls(np.empty(size, dtype=STATE_DTYPE))
+        start = 0
+        for name, result in blocks:
+            start = store.write(start, result, name, first_index)
+        return store
+
+    @classmethod
+    def create(cls, path, size):
+        """Empty store of ``size`` records backed by a new .npy file, to fill with ``write``."""
+        return cls(np.lib.format.open_memmap(path, mode='w+', dtype=STATE_DTYPE, shape=(size,)))
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        """Store saved with ``save``; memory-mapped unless ``mmap_mode`` is None."""
+        return cls(np.load(path, mmap_mode=mmap_mode))
+
+    @classmethod
+    def concatenate(cls, stores):
+        return cls(np.concatenate([store.records for store in stores]))
+
+    def write(self, start, result, cycle, first_index=0):
+        """Write the records of one cycle result from record ``start``; returns the next free one."""
+        stop = start + np.size(result['P'])
+        state_records(result, cycle, first_index, out=self.records[start:stop])
+        return stop
+
+    def save(self, path):
+        np.save(path, self.records)
+
+    def flush(self):
+        # Push an on-disk store's pending writes to its file
+        if isinstance(self.records, np.memmap):
+            self.records.flush()
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, name):
+        return self.records[name]
+
+    @property
+    def nbytes(self):
+        return self.records.nbytes
+
+    def column(self, name, cp=CP, cv=CV, P_ref=P1, T_ref=T1):
+        """A stored field (a view) or a derived column: u, h, Pv, rho or s, the entropy
+        relative to (P_ref, T_ref)."""
+        if name in STATE_DTYPE.names:
+            return self.records[name]
+        if name not in DERIVED:
+            raise ValueError(f"unknown column {name!r}, expected one of "
+                             f"{', '.join(STATE_DTYPE.names + tuple(DERIVED))}")
+        return DERIVED[name](self.records, cp, cv, P_ref, T_ref)
+
+    def select(self, cycle=None, state=None):
+        """Store of the records of one cycle type and/or state number."""
+        mask = np.ones(len(self.records), dtype=bool)
+        if cycle is not None:
+            mask &= self.records['cycle'] == cycle_code(cycle)
+        if state is not None:
+            mask &= self.records['state'] == state
+        return StateStore(self.records[mask])
+
+    def cycle_arrays(self, cycle):
+        """P, v and T of one cycle type as (points, states) arrays, plus the point index."""
+        records = self.select(cycle).records
+        if not len(records):
+            raise ValueError(f'no {cycle} records in the store')
+        n_states = int(records['state'].max())
+        if len(records) % n_states:
+            raise ValueError(f'{cycle} records do not form whole cycles of {n_states} states')
+        block = records.reshape(-1, n_states)
+        return {'P': block['P'], 'v': block['v'], 'T': block['T'], 'index': block['index'][:, 0]}
@@ -0,0 +1,333 @@
+# Parameter studies: many operating points of one model, run in chunks on a process pool.
+#
+# Points come from a table (CSV or JSON) or a Cartesian grid. A grid is never
+# materialized; each chunk unravels its own index range. Finished chunks are appended to
+# the output as they arrive, in whatever order the workers finish, with a 'point' column
+# holding the original row index. CSV rows are formatted in the workers, so the parent
+# only appends bytes. After each chunk is written, a small JSON checkpoint
+# records the completed chunks and the output size. Resuming truncates the output to
+# that size and runs only the missing chunks.
+
+import csv
+import hashlib
+import inspect
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from .cam_timing import cam_timing_sweep
+from .cycles import atkinson_cycle, compare_cycles, diesel_cycle, dual_cycle, otto_cycle
+from .instrument import drain, merge, pool_initializer
+from .throat_flow import throat_flow
+
+CHUNK_SIZE = 100_000
+
+
+def _cycle_columns(result, prefix=''):
+    return {
+        f'{prefix}eta': result['eta'],
+        f'{prefix}w_net': result['w_net'],
+        f'{prefix}mep': result['mep'],
+        f'{prefix}qout': result['qout'],
+        f'{prefix}P_max': result['P'].max(axis=-1),
+        f'{prefix}T_max': result['T'].max(axis=-1),
+    }
+
+
+def _run_cycle(function):
+    # qin is an input of the Otto and Diesel cycles; it is only an output of the others
+    heat_input_given = 'qin' in inspect.signature(function).parameters
+
+    def run(**params):
+        result = function(**params)
+        columns = {} if heat_input_given else {'qin': result['qin']}
+        columns.update(_cycle_columns(result))
+        # The cutoff ratio actually used goes out as result_alpha, since alpha is also a
+        # dual-cycle input and the output would hide the requested value
+        if 'alpha' in result:
+            columns['result_alpha'] = result['alpha']
+        for key in ('valid', 'T_max_limited'):
+            if key in result:
+                columns[key] = result[key]
+        return columns
+    return run
+
+
+def _run_comparison(**params):
+    result = compare_cycles(**params)
+    columns = {'qin': result['qin']}
+    for cycle in ('dual', 'otto', 'diesel'):
+        columns.update(_cycle_columns(result[cycle], f'{cycle}_'))
+    return columns
+
+
+def _run_valve_lift(**params):
+    return cam_timing_sweep(**params)
+
+
+def _run_throat_flow(**params):
+    return throat_flow(**params)
+
+
+# Model name -> (runner, wrapped function whose keyword arguments are the study inputs)
+MODELS = {
+    'comparison': (_run_comparison, compare_cycles),
+    'dual': (_run_cycle(dual_cycle), dual_cycle),
+    'otto': (_run_cycle(otto_cycle), otto_cycle),
+    'diesel': (_run_cycle(diesel_cycle), diesel_cycle),
+    'atkinson': (_run_cycle(atkinson_cycle), atkinson_cycle),
+    'valve_lift': (_run_valve_lift, cam_timing_sweep),
+    'throat_flow': (_run_throat_flow, throat_flow),
+}
+
+
+def model_parameters(model):
+    # Names a study may set for ``model``, in signature order
+    if model not in MODELS:
+        raise ValueError(f"unknown model {model!r}, expected one of {', '.join(MODELS)}")
+    return list(inspect.signature(MODELS[model][1]).parameters)
+
+
+class TablePoints:
+    """Operating points given row by row: a dict of equal-length columns."""
+
+    def __init__(self, columns):
+        self.columns = {name: np.asarray(values, dtype=float) for name, values in columns.items()}
+        lengths = {values.shape for values in self.columns.values()}
+        if len(lengths) != 1 or len(lengths.pop()) != 1:
+            raise ValueError('table columns must be one-dimensional and of equal length')
+        self.size = len(next(iter(self.columns.values())))
+
+    @property
+    def names(self):
+        return list(self.columns)
+
+    def chunk(self, start, stop):
+        return {name: values[start:stop] for name, values in self.columns.items()}
+
+    def fingerprint(self):
+        digest = hashlib.sha256()
+        for name, values in self.columns.items():
+            digest.update(name.encode())
+            digest.update(np.ascontiguousarray(values).tobytes())
+        return digest.hexdigest()
+
+
+class GridPoints:
+    """Cartesian product of per-parameter value lists; the last parameter varies fastest."""
+
+    def __init__(self, axes):
+        self.axes = {name: np.atleast_1d(np.asarray(values, dtype=float)) for name, values in axes.items()}
+        self.shape = tuple(values.size for values in self.axes.values())
+        self.size = int(np.prod(self.shape, dtype=np.int64))
+
+    @property
+    def names(self):
+        return list(self.axes)
+
+    def chunk(self, start, stop):
+        index = np.unravel_index(np.arange(start, stop), self.shape)
+        return {name: values[i] for (name, values), i in zip(self.axes.items(), index)}
+
+    def fingerprint(self):
+        return hashlib.sha256(json.dumps({name: values.tolist() for name, values in self.axes.items()})
+                              .encode()).hexdigest()
+
+
+def grid_axis(spec):
+    # A list of values, or {"start", "stop", "num"} for evenly spaced ones
+    if isinstance(spec, dict):
+        return np.linspace(spec['start'], spec['stop'], int(spec['num']))
+    return np.asarray(spec, dtype=float)
+
+
+def read_points(path):
+    """Operating points from a CSV file (header row of parameter names) or a JSON file.
+
+    JSON may be a list of row objects, an object of columns, or a Cartesian spec
+    {"grid": {name: values or {"start", "stop", "num"}}, "fixed": {name: value}}.
+    Returns (points, fixed), where fixed holds parameters shared by every point.
+    """
+    if path.lower().endswith('.json'):
+        with open(path) as f:
+            data = json.load(f)
+        if isinstance(data, list):
+            return TablePoints({name: [row[name] for row in data] for name in data[0]}), {}
+        if 'grid' in data:
+            return (GridPoints({name: grid_axis(spec) for name, spec in data['grid'].items()}),
+                    data.get('fixed', {}))
+        return TablePoints(data), {}
+
+    with open(path, newline='') as f:
+        names = [name.strip() for name in next(csv.reader(f))]
+    values = np.loadtxt(path, delimiter=',', skiprows=1, ndmin=2)
+    return TablePoints(dict(zip(names, values.T))), {}
+
+
+def _run_chunk(model, params, fixed, start=None, collect=False):
+    # Output columns of one chunk; given the index of its first point, ``start``, the chunk
+    # as (column names, CSV rows) instead. With ``collect`` (in a pool worker) also return
+    # the worker's drain()
+    run = MODELS[model][0]
+    columns = run(**params, **fixed)
+    clashes = [name for name in columns if name in params or name == 'point']
+    if clashes:
+        raise ValueError(f"{model} output column(s) {', '.join(clashes)} clash with the study inputs")
+    n = len(next(iter(params.values())))
+    outputs = {name: np.broadcast_to(values, (n,)) for name, values in columns.items()}
+    if start is not None:
+        outputs = _csv_rows({'point': np.arange(start, start + n, dtype=np.int64), **params, **outputs})
+    return (outputs, drain()) if collect else outputs
+
+
+def _csv_rows(columns):
+    # Integers as such, everything else with the 17 significant digits that round-trip a float
+    fmt = ','.join('%d' if np.asarray(values).dtype.kind in 'iub' else '%.17g'
+                   for values in columns.values()) + '\n'
+    rows = zip(*(np.asarray(values).tolist() for values in columns.values()))
+    return list(columns), ''.join(map(fmt.__mod__, rows)).encode()
+
+
+class _CsvWriter:
+    def __init__(self, path, offset):
+        self.path = path
+        self.file = open(path, 'r+b' if offset else 'wb')
+        self.file.truncate(offset)
+        self.file.seek(offset)
+        self.header = offset > 0
+
+    def write(self, names, rows):
+        if not self.header:
+            self.file.write((','.join(names) + '\n').encode())
+            self.header = True
+        self.file.write(rows)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+class _ParquetWriter:
+    # One part file per chunk in the output directory, so a rerun chunk simply replaces its part
+    def __init__(self, path, offset):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ImportError('Parquet output needs pyarrow; install it or write to a .csv file') from None
+
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def write(self, point, params, outputs, chunk_index):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.table({'point': point, **params, **{k: np.asarray(v) for k, v in outputs.items()}})
+        part = os.path.join(self.path, f'part-{chunk_index:06d}.parquet')
+        pq.write_table(table, part + '.tmp')
+        os.replace(part + '.tmp', part)
+        return 0
+
+    def close(self):
+        pass
+
+
+def _load_checkpoint(path, key):
+    if not os.path.exists(path):
+        return set(), 0
+    with open(path) as f:
+        state = json.load(f)
+    if state['study'] != key:
+        raise ValueError(f'checkpoint {path} belongs to a different study; remove it or choose '
+                         'another output')
+    return set(state['done']), state['offset']
+
+
+def _save_checkpoint(path, key, done, offset):
+    with open(path + '.tmp', 'w') as f:
+        json.dump({'study': key, 'done': sorted(done), 'offset': offset}, f)
+    os.replace(path + '.tmp', path)
+
+
+def run_study(model, points, out, fixed=None, chunk_size=CHUNK_SIZE, max_workers=None,
+              checkpoint=None, max_pending=None):
+    """Evaluate ``model`` at every operating point and stream the results to ``out``.
+
+    ``points`` is a TablePoints or GridPoints, ``fixed`` a dict of parameters shared by
+    every point. ``out`` ending in .parquet is written as a directory of part files
+    (needs pyarrow), anything else as CSV. The checkpoint defaults to
+    ``out + '.checkpoint.json'``; if it exists, the study resumes from it. Returns the
+    number of points computed in this call.
+    """
+    fixed = dict(fixed or {})
+    allowed = model_parameters(model)
+    unknown = [name for name in points.names + list(fixed) if name not in allowed]
+    if unknown:
+        raise ValueError(f"{model} has no parameter(s) {', '.join(unknown)}; "
+                         f"expected some of {', '.join(allowed)}")
+
+    checkpoint = checkpoint or out + '.checkpoint.json'
+    key = hashlib.sha256(json.dumps({
+        'model': model, 'points': points.fingerprint(), 'size': points.size,
+        'fixed': fixed, 'chunk_size': chunk_size,
+    }, sort_keys=True).encode()).hexdigest()
+    done, offset = _load_checkpoint(checkpoint, key)
+
+    parquet = out.lower().endswith('.parquet')
+    writer = (_ParquetWriter if parquet else _CsvWriter)(out, offset)
+    n_chunks = -(-points.size // chunk_size)
+    todo = [i for i in range(n_chunks) if i not in done]
+
+    def bounds(i):
+        return i * chunk_size, min((i + 1) * chunk_size, points.size)
+
+    def task(i):
+        # Arguments of _run_chunk for chunk i; CSV chunks come back formatted
+        start, stop = bounds(i)
+        return model, points.chunk(start, stop), fixed, None if parquet else start
+
+    def finish(i, result):
+        nonlocal offset
+        if parquet:
+            start, stop = bounds(i)
+            writer.write(np.arange(start, stop, dtype=np.int64), points.chunk(start, stop), result, i)
+        else:
+            offset = writer.write(*result)
+        done.add(i)
+        _save_checkpoint(checkpoint, key, done, offset)
+
+    computed = 0
+    try:
+        if max_workers == 1:
+            for i in todo:
+                finish(i, _run_chunk(*task(i)))
+                computed += bounds(i)[1] - bounds(i)[0]
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers,
+                                     initializer=pool_initializer()) as pool:
+                # Keep a bounded number of chunks in flight so a huge study does not queue
+                # every chunk's inputs at once
+                limit = max_pending or 2 * (max_workers or os.cpu_count() or 1)
+                pending = {}
+                queue = iter(todo)
+                while True:
+                    for i in queue:
+                        pending[pool.submit(_run_chunk, *task(i), True)] = i
+                        if len(pending) >= limit:
+                            break
+                    if not pending:
+                        break
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        i = pending.pop(future)
+                        result, recorded = future.result()
+                        merge(recorded)
+                        finish(i, result)
+                        computed += bounds(i)[1] - bounds(i)[0]
+    finally:
+        writer.close()
+    return computed
@@ -0,0 +1,77 @@
+from functools import lru_cache
+
+import numpy as np
+
+from .instrument import timed
+
+# Air-standard constants used by the cycle scripts
+K = 1.4
+CP = 1.005  # kJ/kg.K
+CV = 0.718  # kJ/kg.K
+P1 = 100  # kPa
+T1 = 300  # K
+
+
+@timed('isentropic', samples=lambda result: np.size(result[0]))
+def isentropic_process(P_start, v_start, P_end, v_end, num_points=100, k=K):
+    # Points on P * v^k = constant between the two states, for plotting
+    v_values = np.linspace(min(v_start, v_end), max(v_start, v_end), num_points)
+    constant = P_start * (v_start**k)
+    P_values = constant / (v_values**k)
+    return v_values, P_values
+
+
+# Default relative tolerance on P(v) for the sampled isentropic curves
+CURVE_TOL = 1e-3
+
+
+def isentropic_num_points(v_ratio, k=K, tol=CURVE_TOL):
+    """Number of log-spaced samples for which linear interpolation of P = C/v^k between
+    them stays within relative error ``tol`` over a volume ratio ``v_ratio``.
+
+    On a log-spaced grid every interval has the same ratio r = exp(h), and the largest
+    relative interpolation error is close to k*(k+1)*h^2/8, whatever the curve's constant.
+    """
+    k = np.asarray(k, dtype=float)
+    h = 0.95 * np.sqrt(8 * tol / (k * (k + 1)))  # 5 % margin for the higher-order terms
+    log_ratio = np.abs(np.log(np.asarray(v_ratio, dtype=float)))
+    return np.maximum(np.ceil(log_ratio / h).astype(int) + 1, 2)
+
+
+@timed('isentropic', samples=lambda result: np.size(result[0]))
+def isentropic_curves(P_start, v_start, v_end, k=K, tol=CURVE_TOL, num_points=None):
+    """Log-spaced P = C/v^k curves for a batch of (P_start, v_start, v_end, k) at once.
+
+    The arguments broadcast to a batch shape; the result is (v, P) with shape
+    batch + (num_points,), v running from the smaller to the larger volume as in
+    ``isentropic_process``. ``num_points`` defaults to the largest count any curve in the
+    batch needs to meet ``tol``.
+    """
+    P_start, v_start, v_end, k = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (P_start, v_start, v_end, k)))
+    if num_points is None:
+        num_points = int(np.max(isentropic_num_points(v_end / v_start, k, tol), initial=2))
+
+    v_min = np.minimum(v_start, v_end)[..., None]
+    v_max = np.maximum(v_start, v_end)[..., None]
+    v_values = v_min * (v_max / v_min)**np.linspace(0, 1, num_points)
+    v_values[..., -1] = v_max[..., 0]  # exact end point, free of rounding in the power
+    P_values = P_start[..., None] * (v_start[..., None] / v_values)**k[..., None]
+    return v_values, P_values
+
+
+@lru_cache(maxsize=1024)
+def _cached_curve(P_start, v_start, v_end, k, tol):
+    v_values, P_values = isentropic_curves(P_start, v_start, v_end, k, tol)
+    v_values.flags.writeable = False
+    P_values.flags.writeable = False
+    return v_values, P_values
+
+
+def isentropic_curve(P_start, v_start, v_end, k=K, tol=CURVE_TOL):
+    """One log-spaced isentropic curve, memoized on its parameters.
+
+    The compression curve 1-2 is the same for the Otto, Diesel and dual cycles at equal
+    rc, P1 and T1, so it is computed once and shared. The returned arrays are read-only.
+    """
+    return _cached_curve(float(P_start), float(v_start), float(v_end), float(k), float(tol))
@@ -0,0 +1,52 @@
+import numpy as np
+
+from .instrument import array_size, timed
+
+# Specific gas constant for air (J/(kg*K))
+R_AIR = 287.0
+
+
+def critical_pressure_ratio(gamma=1.4):
+    # Throat-to-stagnation pressure ratio at which the flow chokes
+    gamma = np.asarray(gamma, dtype=float)
+    return (2 / (gamma + 1))**(gamma / (gamma - 1))
+
+
+@timed('flow', samples=array_size('mdot'))
+def throat_flow(Pt, Tt, P_down, A_throat, gamma=1.4, R=R_AIR):
+    """Isentropic flow through a converging throat, evaluated for whole arrays at once.
+
+    Pt (Pa), Tt (K), P_down (Pa), A_throat (m^2), gamma and R broadcast against each other,
+    so a grid of operating points can be passed as e.g. Pt[:, None, None], Tt[None, :, None].
+
+    Returns a dict with the throat velocity (m/s), mass flow rate (kg/s) and a boolean
+    ``choked`` mask (True in the sonic region). Points with Pt <= P_down have no forward
+    flow and get zero velocity and mass flow.
+    """
+    Pt = np.asarray(Pt, dtype=float)
+    Tt = np.asarray(Tt, dtype=float)
+    gamma = np.asarray(gamma, dtype=float)
+
+    P_ratio = np.asarray(P_down, dtype=float) / Pt
+    P_ratio_critical = critical_pressure_ratio(gamma)
+    choked = P_ratio <= P_ratio_critical
+    flowing = P_ratio < 1
+
+    # Choked points see the critical ratio at the throat; this makes the subsonic
+    # expressions below reduce to the sonic ones, so one formula covers both regions.
+    r = np.where(choked, P_ratio_critical, np.minimum(P_ratio, 1.0))
+    g1 = (gamma - 1) / gamma
+    r_g1 = r**g1
+
+    V_t = np.sqrt((2 * gamma * R * Tt / (gamma - 1)) * (1 - r_g1))
+
+    # r^(2/k) - r^((k+1)/k) = r^(2/k) * (1 - r^((k-1)/k))
+    flux = np.sqrt((2 * gamma / ((gamma - 1) * R * Tt)) * r**(2 / gamma) * (1 - r_g1))
+    mdot = A_throat * Pt * flux
+
+    V_t, mdot, choked, flowing = np.broadcast_arrays(V_t, mdot, choked, flowing)
+    return {
+        'velocity': np.where(flowing, V_t, 0.0),
+        'mdot': np.where(flowing, mdot, 0.0),
+        'choked': choked.copy(),
+    }
@@ -0,0 +1,57 @@
+import numpy as np
+
+from .instrument import array_size, timed
+
+# Length of one 4-stroke cycle in crank degrees
+CYCLE_ANGLE = 720.0
+
+
+@timed('lift', samples=array_size())
+def valve_lift(theta, theta_open, theta_close, l_max, duration=None, cycle=CYCLE_ANGLE):
+    """Half-sine valve lift for one or many valve events, evaluated on the whole array at once.
+
+    All arguments broadcast against each other, so passing event parameters with shape
+    (n_events, 1) and ``theta`` with shape (n_angles,) gives an (n_events, n_angles) result.
+    If ``duration`` is None it is taken as the opening-to-closing angle, wrapped at ``cycle``.
+    """
+    theta = np.asarray(theta, dtype=float)
+    theta_open = np.asarray(theta_open, dtype=float)
+    l_max = np.asarray(l_max, dtype=float)
+    if duration is None:
+        duration = np.mod(np.asarray(theta_close, dtype=float) - theta_open, cycle)
+    duration = np.asarray(duration, dtype=float)
+
+    # Angle since the valve opened, wrapped around the end of the cycle
+    # (floor-based wrap: cheaper than np.mod on large arrays)
+    phase = theta - theta_open
+    phase -= cycle * np.floor(phase / cycle)
+    active = phase <= duration
+
+    phase, duration, l_max, active = np.broadcast_arrays(phase, duration, l_max, active)
+    lift = np.zeros(phase.shape)
+    np.sin(np.pi * phase / duration, out=lift, where=active)
+    lift *= l_max
+    np.maximum(lift, 0.0, out=lift)  # Ensure no negative lift
+    return lift
+
+
+def valve_events_lift(theta, events, cycle=CYCLE_ANGLE):
+    """Lift of every event in ``events`` as an (n_events, n_angles) array.
+
+    ``events`` is a sequence of (opening angle, closing angle, duration, max lift) rows.
+    A duration of NaN means "closing minus opening angle, wrapped at ``cycle``".
+    """
+    events = np.atleast_2d(np.asarray(events, dtype=float))
+    theta_open = events[:, 0, None]
+    theta_close = events[:, 1, None]
+    duration = events[:, 2, None]
+    l_max = events[:, 3, None]
+
+    duration = np.where(np.isnan(duration), np.mod(theta_close - theta_open, cycle), duration)
+    return valve_lift(np.asarray(theta, dtype=float)[None, :], theta_open, theta_close, l_max,
+                      duration=duration, cycle=cycle)
+
+
+def combined_lift(theta, events, cycle=CYCLE_ANGLE):
+    # Lift of a single valve whose lobes are given as separate events
+    return valve_events_lift(theta, events, cycle=cycle).max(axis=0)